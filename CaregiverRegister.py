@@ -1,24 +1,18 @@
 
 
 import streamlit as st
-import json
-import os
 import re
 
-st.set_page_config(page_title="Caregiver Registration", layout="centered")
-
-file_path = "users.json"
+from geo import normalize_location
+from profiling import profile_page
+from store import add_user, find_user
 
+profile_page(__file__)
 
-# ---------- Utility functions ----------
-def load_users():
-    return json.load(open(file_path)) if os.path.exists(file_path) else []
-
-
-def save_users(data):
-    json.dump(data, open(file_path, "w"), indent=4)
+st.set_page_config(page_title="Caregiver Registration", layout="centered")
 
 
+# ---------- Utility functions ----------
 def is_valid_password(password):
     """Check password: min 8 chars, 1 uppercase, 1 lowercase, and 1 digit"""
     if len(password) < 8:
@@ -90,11 +84,10 @@ with st.form(key="registration_form"):
 
 # ---------- Form Submission Logic ----------
 if submitted:
-    users = load_users()
     errors = []
 
     # Username uniqueness check
-    if any(u["username"] == username for u in users):
+    if find_user(username):
         errors.append("🚫 Username already exists.")
 
     # Required fields
@@ -120,16 +113,22 @@ if submitted:
             st.error(err)
     else:
         skills_str = ", ".join(selected_skills)
-        users.append({
+        # Store the canonical city and its coordinates so distance matching works
+        place = normalize_location(location)
+        new_user = {
             "username": username,
             "password": password,
             "role": "Caregiver",
-            "location": location,
+            "location": place["name"] if place else location.strip(),
+            "lat": place["lat"] if place else None,
+            "lon": place["lon"] if place else None,
             "contact": cleaned_contact,
             "skills": skills_str,
             "name": name
-        })
-        save_users(users)
+        }
+        if not add_user(new_user):
+            st.error("🚫 Username already exists.")
+            st.stop()
         st.success("✅ Caregiver registered successfully! Redirecting to login...")
         st.session_state["preferred_role"] = "Caregiver"
         st.switch_page("pages/Login.py")  # Redirect immediately
@@ -1,20 +1,22 @@
 
 import streamlit as st
-import json
-import os
 import datetime
 
+from changes import task_id
+from inbox import badge, conversations, mark_read, preview, send_message
+from models import ChatMessage
+from profiling import profile_page
+from reliability import update_task
+from scheduler import flag_overdue_in, parse_due, task_schedule
+from store import find_user, shard_key, shard_store, user_shards
+
 # ---------- Setup ----------
+profile_page(__file__)
+
 st.set_page_config(page_title="Caregiver Dashboard", layout="wide")
 st.title("👤 Caregiver Dashboard")
 
-# ---------- JSON Utilities ----------
-def load_json(file):
-    return json.load(open(file)) if os.path.exists(file) else []
-
-def save_json(file, data):
-    json.dump(data, open(file, "w"), indent=2)
-
+# ---------- Utilities ----------
 def clean_skills(s):
     return [i.strip() for i in s.split(",")] if isinstance(s, str) else s
 
@@ -25,10 +27,33 @@ if not user or user.get("role") != "Caregiver":
     st.stop()
 
 # ---------- Load Data ----------
-tasks = load_json("assigned_tasks.json")
-assignments = load_json("assignments.json")
-users = load_json("users.json")
-chat = load_json("chat.json")
+# Work happens in the shard of the caretaker who assigned this caregiver
+linked_shards = user_shards(user.get("username")) or [shard_key(user.get("location"))]
+my_shard = linked_shards[0]
+for shard in linked_shards:
+    if any(a.get("caregiver") == user.get("username") for a in shard_store("assignments", shard).load()):
+        my_shard = shard
+        break
+
+tasks_store = shard_store("tasks", my_shard)
+chat_store = shard_store("chat", my_shard)
+tasks_version, tasks = tasks_store.load_versioned()
+assignments = shard_store("assignments", my_shard).load()
+# Read-only slotted records, decoded once per chat file version
+chat = chat_store.load_models(ChatMessage)
+
+# ---------- Task Reminders ----------
+schedule = task_schedule(tasks, tasks_store.path, tasks_version)
+if flag_overdue_in(tasks_store, tasks, schedule):
+    tasks_version, tasks = tasks_store.load_versioned()
+    schedule = task_schedule(tasks, tasks_store.path, tasks_version)
+
+due_soon = [(due, tasks[i]) for due, i in schedule.due_soon() if tasks[i].get("caregiver") == user.get("username")]
+overdue = [(due, tasks[i]) for due, i in schedule.overdue() if tasks[i].get("caregiver") == user.get("username")]
+for due, t in due_soon:
+    st.info(f"⏰ **{t.get('task')}** is due at {t.get('time')}.")
+for due, t in overdue:
+    st.warning(f"⚠️ **{t.get('task')}** was due {due.strftime('%d %b, %I:%M %p')} and is still Pending.")
 
 # ---------- Get Assigned Caretaker Info ----------
 my_assignment = next(
@@ -40,7 +65,7 @@ else:
     caretaker_username = my_assignment.get("caretaker")
     caretaker_user = None
     if caretaker_username:
-        caretaker_user = next((u for u in users if u.get("username") == caretaker_username), None)
+        caretaker_user = find_user(caretaker_username)
 
     if caretaker_user:
         caretaker_name = caretaker_user.get("name", caretaker_username)
@@ -65,10 +90,11 @@ else:
         st.info("You have no assigned tasks.")
     else:
         for t in my_tasks:
+            overdue_text = " ⚠️ Overdue" if t.get("status", "Pending") == "Pending" and t.get("overdue") else ""
             st.markdown(f"""
             **🧾 Task:** {t.get('task', 'N/A')}  
             **⏰ Time:** {t.get('time', 'N/A')}  
-            **📌 Status:** `{t.get('status', 'Pending')}`
+            **📌 Status:** `{t.get('status', 'Pending')}`{overdue_text}
             """)
             new_status = st.selectbox(
                 "Update Status",
@@ -82,18 +108,33 @@ else:
                 reason = st.text_input("Reason for missing this task", key=f"reason_{t.get('task')}")
 
             if st.button("🔁 Update", key=f"update_{t.get('task')}"):
-                for i in tasks:
-                    if i == t:
-                        i["status"] = new_status
-                        i["reason"] = reason if new_status == "Missed" else ""
-                        break
-                save_json("assigned_tasks.json", tasks)
+                def apply(fresh, tid=task_id(t), new_status=new_status, reason=reason):
+                    i = next((i for i in fresh if task_id(i) == tid), None)
+                    if i is None:
+                        return None
+                    before = dict(i)
+                    # Settled after its due time: late, even if no page flagged it overdue yet
+                    due = parse_due(i)
+                    if new_status != "Pending" and due and due < datetime.datetime.now():
+                        i["overdue"] = True
+                    i["status"] = new_status
+                    i["reason"] = reason if new_status == "Missed" else ""
+                    return before, dict(i)
+
+                update_task(tasks_store, apply)
                 st.success("✅ Task status updated.")
                 st.rerun()
 
 
     # --- Chat with Caretaker (only assigned) ---
-    st.subheader("💬 Chat with Your Caretaker")
+    inbox = dict(conversations(user.get("username"), linked_shards))
+    st.subheader("💬 Chat with Your Caretaker" + badge(inbox.get(caretaker_username)))
+    # Other caretakers this caregiver has talked to, most recent first
+    others = [(other, entry) for other, entry in inbox.items() if other != caretaker_username]
+    if others:
+        st.markdown("#### 📥 Other Conversations")
+        for other, entry in others:
+            st.markdown(f"- **{other}**{badge(entry)} — {preview(entry, user.get('username'))}")
 
     chat_history = [
         c for c in chat
@@ -112,18 +153,18 @@ else:
             st.markdown(
                 f"<div style='text-align: left; background-color: #F1F0F0; padding: 10px; margin: 5px; border-radius: 10px; max-width: 70%; margin-right: auto;'>"
                 f"**{sender}:** {c.get('message', '')}</div>", unsafe_allow_html=True)
+    mark_read(chat_store, user.get("username"), caretaker_username)
 
     # Chat input and send button
     new_msg = st.text_input("Write a message to your Caretaker", key="new_chat_message")
     if st.button("Send Message") and new_msg.strip():
-        chat.append({
+        message = {
             "from": user.get("username"),
             "to": caretaker_username,
             "message": new_msg.strip(),
             "timestamp": datetime.datetime.now().isoformat()
-            
-        })
-        save_json("chat.json", chat)
+        }
+        send_message(chat_store, message)
         st.rerun()
 
 
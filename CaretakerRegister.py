@@ -1,19 +1,15 @@
 import streamlit as st
-import json
-import os
 import re
 
-st.set_page_config(page_title="Caretaker Registration", layout="centered")
-
-# ---------- Utility functions ----------
-file_path = "users.json"
+from geo import normalize_location
+from profiling import profile_page
+from store import add_user, find_user
 
-def load_users():
-    return json.load(open(file_path)) if os.path.exists(file_path) else []
+profile_page(__file__)
 
-def save_users(data):
-    json.dump(data, open(file_path, "w"), indent=4)
+st.set_page_config(page_title="Caretaker Registration", layout="centered")
 
+# ---------- Utility functions ----------
 def is_valid_password(password):
     """Check password for length and character requirements."""
     if len(password) < 8:
@@ -89,11 +85,10 @@ with st.form(key="registration_form"):
 
 # ---------- Form Submission Logic ----------
 if submitted:
-    users = load_users()
     errors = []
 
     # Username must be unique
-    if any(u["username"] == username for u in users):
+    if find_user(username):
         errors.append("🚫 Username already exists.")
 
     # Check that all required fields are filled
@@ -122,18 +117,23 @@ if submitted:
         for err in errors:
             st.error(err)
     else:
-        # Save new user
-        users.append({
+        # Save new user with the canonical city and its coordinates
+        place = normalize_location(location)
+        new_user = {
             "username": username,
             "password": password,
             "contact": cleaned_contact,
             "role": "Caretaker",
-            "location": location,
+            "location": place["name"] if place else location.strip(),
+            "lat": place["lat"] if place else None,
+            "lon": place["lon"] if place else None,
             "skills": "",
             "name": name,
             "age": age
-        })
-        save_users(users)
+        }
+        if not add_user(new_user):
+            st.error("🚫 Username already exists.")
+            st.stop()
         st.success("✅ Registration successful! Redirecting to login...")
         st.session_state["preferred_role"] = "Caretaker"
         st.switch_page("pages/Login.py")  # Redirect immediately
@@ -1,22 +1,38 @@
 import streamlit as st
-import json
-import os
 import datetime
+import uuid
+
+from changes import LiveView
+from geo import CaregiverIndex, normalize_location
+from inbox import badge, conversations, mark_read, preview, send_message
+from models import ChatMessage
+from pricing import quote, skill_fees
+from profiling import profile_page
+from reliability import add_task, counters, summary
+from scheduler import flag_overdue_in, task_schedule
+from store import (find_user, link_shard, load_users, save_payment, shard_key, shard_store, shards, shards_near,
+                   user_shards)
 
 # ---------- Setup ----------
+profile_page(__file__)
+
 st.set_page_config(page_title="Caretaker Dashboard", layout="wide")
 st.title("🧑‍⚕️ Caretaker Dashboard")
 
-# ---------- JSON Utilities ----------
-def load_json(file):
-    return json.load(open(file)) if os.path.exists(file) else []
-
-def save_json(file, data):
-    json.dump(data, open(file, "w"), indent=2)
-
+# ---------- Utilities ----------
 def clean_skills(s):
     return [i.strip() for i in s.split(",")] if isinstance(s, str) else s
 
+def location_name(u):
+    place = normalize_location(u.get("location", ""))
+    return place["name"] if place else u.get("location", "").strip()
+
+@st.cache_resource(max_entries=32)
+def caregiver_index(shard_names, versions):
+    """KD-tree over the caregivers of some shards; versions (their users files') keys the cache."""
+    caregivers = [u for u in load_users(shard_names) if u.get("role") == "Caregiver"]
+    return CaregiverIndex(caregivers, lambda cg: clean_skills(cg.get("skills", [])))
+
 
 # ---------- User Check ----------
 user = st.session_state.get("user")
@@ -25,57 +41,104 @@ if not user or not isinstance(user, dict) or user.get("role") != "Caretaker":
     st.stop()
 
 # ---------- Load Data ----------
-users = load_json("users.json")
-caregivers = [u for u in users if u.get("role") == "Caregiver"]
-assignments = load_json("assignments.json")
-tasks = load_json("assigned_tasks.json")
-chat = load_json("chat.json")
-payments = load_json("payments.json")
-
-
-# ---------- Skill Fees ----------
-skill_fees = {
-    "Bathing": 100,
-    "Feeding": 80,
-    "Cleaning": 90,
-    "Toilet Cleaning": 110,
-    "Hair Cutting": 120,
-    "Medication Reminders": 95,
-    "Dressing Support": 85,
-    "Mobility Assistance": 130
-}
+# Assignments, tasks and chat live in the caretaker's location shard
+my_shard = (user_shards(user["username"]) or [shard_key(user.get("location"))])[0]
+assignments_store = shard_store("assignments", my_shard)
+tasks_store = shard_store("tasks", my_shard)
+chat_store = shard_store("chat", my_shard)
+assignments = assignments_store.load()
+tasks_version, tasks = tasks_store.load_versioned()
+# Read-only slotted records, decoded once per chat file version
+chat = chat_store.load_models(ChatMessage)
+
+# Task status view kept current by applying change-feed deltas
+view_key = f"tasks_view_{my_shard}"
+if view_key not in st.session_state:
+    st.session_state[view_key] = LiveView(tasks_store)
+tasks_view = st.session_state[view_key]
+
+# ---------- Task Reminders ----------
+schedule = task_schedule(tasks, tasks_store.path, tasks_version)
+if flag_overdue_in(tasks_store, tasks, schedule):
+    tasks_version, tasks = tasks_store.load_versioned()
+    schedule = task_schedule(tasks, tasks_store.path, tasks_version)
+
+st.subheader("⏰ Task Reminders")
+due_col, overdue_col = st.columns(2)
+with due_col:
+    st.markdown("**Due in the next hour**")
+    due_soon = [(due, tasks[i]) for due, i in schedule.due_soon() if tasks[i].get("caretaker") == user["username"]]
+    for due, t in due_soon:
+        st.markdown(f"- 🧾 {t['task']} — {t['caregiver']} at **{t['time']}**")
+    if not due_soon:
+        st.caption("Nothing due soon.")
+with overdue_col:
+    st.markdown("**Overdue, still Pending**")
+    overdue = [(due, tasks[i]) for due, i in schedule.overdue() if tasks[i].get("caretaker") == user["username"]]
+    for due, t in overdue:
+        st.markdown(f"- ⚠️ {t['task']} — {t['caregiver']} (due {due.strftime('%d %b, %I:%M %p')})")
+    if not overdue:
+        st.caption("No overdue tasks.")
 
 
 # ---------- Assign Caregiver ----------
 st.subheader("📌 Assign a Caregiver")
 
-filter_col1, filter_col2 = st.columns(2)
+location_options = ["Any"] + sorted(set(shards()) | {location_name(user)} - {""})
+my_location = location_name(user)
+
+filter_col1, filter_col2, filter_col3 = st.columns(3)
 with filter_col1:
     location_filter = st.selectbox(
-        "📍 Filter by Location",
-        ["Any"] + sorted({c.get("location", "") for c in caregivers if c.get("location")})
+        "📍 Near Location",
+        location_options,
+        index=location_options.index(my_location) if my_location in location_options else 0
     )
 with filter_col2:
+    radius_km = st.slider("📏 Within (km)", min_value=5, max_value=200, value=20, step=5)
+
+# Only load users from the shards the location filter can reach
+origin = normalize_location(location_filter) if location_filter != "Any" else None
+if origin:
+    candidate_shards = shards_near(origin["lat"], origin["lon"], radius_km)
+elif location_filter != "Any":
+    candidate_shards = [shard_key(location_filter)]
+else:
+    candidate_shards = shards()
+caregivers = [u for u in load_users(candidate_shards) if u.get("role") == "Caregiver"]
+
+with filter_col3:
     all_skills = {skill for cg in caregivers for skill in clean_skills(cg.get("skills", []))}
     required_skills = st.multiselect("🛠 Required Skills", sorted(all_skills))
 
 
+# Nearest-first radius query over a KD-tree of caregiver coordinates, built once per users-file version
 matched = []
-for cg in caregivers:
-    cg_skills = clean_skills(cg.get("skills", []))
-    if all(skill in cg_skills for skill in required_skills):
-        if location_filter == "Any" or cg.get("location") == location_filter:
-            matched.append(cg)
+if origin:
+    users_versions = tuple(shard_store("users", s).version() for s in candidate_shards)
+    matched = caregiver_index(tuple(candidate_shards), users_versions).nearby(origin["lat"], origin["lon"], radius_km, required_skills)
+else:
+    # "Any", or a location missing from the gazetteer: fall back to name matching
+    for cg in caregivers:
+        cg_skills = clean_skills(cg.get("skills", []))
+        if all(skill in cg_skills for skill in required_skills):
+            if location_filter == "Any" or location_name(cg).casefold() == location_filter.casefold():
+                matched.append((None, cg))
 
+# Counters from every shard the matched caregivers take tasks in
+reliability = counters({s for _, cg in matched for s in user_shards(cg["username"])})
 
 if not matched:
     st.info("No caregiver matches the selected filters.")
 else:
-    for cg in matched:
+    for distance_km, cg in matched:
+        cg_skills = clean_skills(cg.get("skills", []))
         with st.expander(f"👤 {cg['username']} ({', '.join(cg_skills[:3])}{'...' if len(cg_skills) > 3 else ''})"):
-            st.markdown(f"- 📍 Location: **{cg.get('location', 'N/A')}**")
+            distance_text = f" (~{distance_km:.0f} km away)" if distance_km is not None else ""
+            st.markdown(f"- 📍 Location: **{cg.get('location', 'N/A')}**{distance_text}")
             st.markdown(f"- 📞 Contact: **{cg.get('contact', 'N/A')}**")
             st.markdown(f"- 🔧 Skills: {', '.join(cg_skills)}")
+            st.markdown(f"- ⭐ Reliability: {summary(reliability.get(cg['username']))}")
 
             with st.form(key=f"assign_form_{cg['username']}"):
                 duration = st.selectbox("🕒 Duration", ["15 Days", "1 Month", "3 Months"], key=f"duration_{cg['username']}")
@@ -102,11 +165,32 @@ else:
                         "joining_date": joining_date.isoformat(),
                         "ending_date": ending_date.isoformat()
                     })
-                    save_json("assignments.json", assignments)
+                    assignments_store.save(assignments)
+                    link_shard(cg["username"], my_shard)
                     st.success(f"✅ Assigned {cg['username']} successfully!")
                     st.rerun()
 
 
+# Re-renders on a timer from the change feed, so status updates from the
+# caregiver show up without reloading the page or the tasks file
+@st.fragment(run_every="10s")
+def show_task_status(caregiver):
+    tasks_view.refresh()
+    cg_tasks = [t for t in tasks_view.records.values() if t["caregiver"] == caregiver]
+    if not cg_tasks:
+        st.info("No tasks yet.")
+    else:
+        for t in cg_tasks:
+            reason_text = f"**💬 Reason:** {t['reason']}" if t['status'] == "Missed" else ""
+            overdue_text = " ⚠️ Overdue" if t['status'] == "Pending" and t.get("overdue") else ""
+            st.markdown(f"""
+                **🧾 Task:** {t['task']}  
+                **⏲ Time:** {t['time']}  
+                **📌 Status:** `{t['status']}`{overdue_text}  
+                {reason_text}
+            """)
+
+
 # ---------- Manage Caregivers ----------
 st.subheader("📝 Manage Caregivers")
 assigned = [a for a in assignments if a.get("caretaker") == user["username"]]
@@ -115,7 +199,7 @@ if not assigned:
     st.info("No caregivers assigned yet.")
 else:
     for i, a in enumerate(assigned):
-        cg_data = next((u for u in users if u["username"] == a["caregiver"]), None)
+        cg_data = find_user(a["caregiver"])
         if not cg_data:
             continue
         with st.expander(f"👤 {cg_data['username']} - {cg_data.get('name', '')}"):
@@ -134,7 +218,8 @@ else:
                 task_submitted = st.form_submit_button("Assign")
 
                 if task_submitted and selected_skill:
-                    tasks.append({
+                    add_task(tasks_store, {
+                        "id": uuid.uuid4().hex,
                         "caretaker": user["username"],
                         "caregiver": cg_data["username"],
                         "task": selected_skill,
@@ -144,31 +229,31 @@ else:
                         "reason": "",
                         "created_at": datetime.datetime.now().isoformat()
                     })
-                    save_json("assigned_tasks.json", tasks)
                     st.success("✅ Task assigned successfully.")
                     st.rerun()
 
             st.markdown("### 📋 Current Task Status")
-            cg_tasks = [t for t in tasks if t["caregiver"] == cg_data["username"]]
-            if not cg_tasks:
-                st.info("No tasks yet.")
-            else:
-                for t in cg_tasks:
-                    reason_text = f"**💬 Reason:** {t['reason']}" if t['status'] == "Missed" else ""
-                    st.markdown(f"""
-                        **🧾 Task:** {t['task']}  
-                        **⏲ Time:** {t['time']}  
-                        **📌 Status:** `{t['status']}`  
-                        {reason_text}
-                    """)
+            show_task_status(cg_data["username"])
 
 # ---------- Chat Interface ----------
 st.subheader("💬 Chat with Caregiver")
 
-active_caregivers = sorted(set(a["caregiver"] for a in assigned))
+# Summaries are kept up to date on every send, so the inbox never scans the chat
+inbox = dict(conversations(user["username"], [my_shard]))
+if inbox:
+    st.markdown("#### 📥 Inbox")
+    for other, entry in inbox.items():
+        st.markdown(f"- **{other}**{badge(entry)} — {preview(entry, user['username'])}")
+
+def last_message_time(u):
+    return (inbox.get(u, {}).get("last") or {}).get("timestamp", "")
+
+# Most recent conversation first, then the rest alphabetically
+active_caregivers = sorted(sorted(set(a["caregiver"] for a in assigned)), key=last_message_time, reverse=True)
 options = ["-- Select a Caregiver --"] + active_caregivers
 
-selected_chat_user = st.selectbox("Select Caregiver", options, key="chat_selectbox")
+selected_chat_user = st.selectbox("Select Caregiver", options, key="chat_selectbox",
+                                  format_func=lambda u: u + badge(inbox.get(u)))
 
 if selected_chat_user != "-- Select a Caregiver --":
     chat_history = [
@@ -188,16 +273,17 @@ if selected_chat_user != "-- Select a Caregiver --":
                 f"<div style='text-align: left; background-color: #F1F0F0; margin: 5px; padding:10px; border-radius:10px;'>**{c['from']}:** {c['message']}</div>",
                 unsafe_allow_html=True,
             )
+    mark_read(chat_store, user["username"], selected_chat_user)
 
     new_msg = st.text_input("Write a message", key="chat_input")
     if st.button("Send", key="chat_send") and new_msg.strip():
-        chat.append({
+        message = {
             "from": user["username"],
             "to": selected_chat_user,
             "message": new_msg.strip(),
             "timestamp": datetime.datetime.now().isoformat()
-        })
-        save_json("chat.json", chat)
+        }
+        send_message(chat_store, message)
         st.rerun()
 else:
     st.info("Please select a caregiver to start chatting.")
@@ -207,22 +293,15 @@ else:
 st.title("🧑‍⚕️ Caregiver Payment Calculator")
 
 
-def load_json_safe(filename):
-    if os.path.exists(filename):
-        with open(filename, "r") as f:
-            return json.load(f)
-    else:
-        return []
-
-users = load_json_safe("users.json")
-assignments = load_json_safe("assignments.json")
+assignments = assignments_store.load()
 
 current_user = user["username"]
 
 assigned = [a for a in assignments if a.get("caretaker") == current_user]
 cg_usernames = [a["caregiver"] for a in assigned]
 
-cg_names = {u["username"]: u.get("name", u["username"]) for u in users if u["username"] in cg_usernames}
+cg_users = [find_user(u) for u in set(cg_usernames)]
+cg_names = {u["username"]: u.get("name", u["username"]) for u in cg_users if u}
 cg_options = {cg_names[u]: u for u in cg_usernames if u in cg_names}
 
 if not cg_options:
@@ -232,10 +311,8 @@ if not cg_options:
 selected_name = st.selectbox("Select Caregiver", options=list(cg_options.keys()))
 selected_cg = cg_options.get(selected_name)
 
-joining_str = next(
-    (a.get("joining_date") for a in assigned if a.get("caregiver") == selected_cg),
-    datetime.date.today().isoformat()
-)
+selected_assignment = next((a for a in assigned if a.get("caregiver") == selected_cg), {})
+joining_str = selected_assignment.get("joining_date", datetime.date.today().isoformat())
 
 try:
     start_date = datetime.date.fromisoformat(joining_str)
@@ -250,24 +327,14 @@ if end_date < start_date:
     st.error("End Date cannot be earlier than Joining Date.")
     st.stop()
 
-total_days = max((end_date - start_date).days, 1)
+selected_skills = st.multiselect("Select Skills", options=list(skill_fees(start_date).keys()))
 
-skill_fees = {
-    "Bathing": 100,
-    "Feeding": 80,
-    "Cleaning": 90,
-    "Toilet Cleaning": 110,
-    "Hair Cutting": 120,
-    "Medication Reminders": 95,
-    "Dressing Support": 85,
-    "Mobility Assistance": 130
-}
-
-selected_skills = st.multiselect("Select Skills", options=list(skill_fees.keys()))
-
-fee_breakdown = {skill: skill_fees[skill] for skill in selected_skills}
-per_day_fee = sum(fee_breakdown.values())
-total_fees = per_day_fee * total_days
+# Memoized per (skills, dates, location, duration, rate-card version)
+fee_quote = quote(selected_skills, start_date, end_date, my_shard, selected_assignment.get("duration"))
+fee_breakdown = fee_quote["breakdown"]
+per_day_fee = fee_quote["daily_fee"]
+total_days = fee_quote["total_days"]
+total_fees = fee_quote["total_fee"]
 
 if selected_skills:
     st.subheader("📊 Skill Fee Breakdown (Per Day)")
@@ -276,12 +343,14 @@ if selected_skills:
 
     st.markdown(f"👤 **Caregiver:** {selected_name}")
     st.markdown(f"📅 **Total Duration:** {total_days} days")
+    if fee_quote["discount"]:
+        st.markdown(f"🏷️ **{selected_assignment.get('duration')} discount:** {fee_quote['discount']:.0%}")
     st.markdown(f"💰 **Total Fee:** ₹{total_fees:.2f}")
 else:
     st.info("Select at least one skill to see the fee details.")
 
 # Save payment record
-if st.button("💾 Save Payment Record", key=f"save_payment_{selected_cg}"):
+if st.button("💾 Save Payment Record", key=f"save_payment_{selected_cg}", disabled=not selected_skills):
     payment_entry = {
         "caretaker": current_user,
         "caregiver": selected_cg,
@@ -291,22 +360,20 @@ if st.button("💾 Save Payment Record", key=f"save_payment_{selected_cg}"):
         "end_date": end_date.isoformat(),
         "total_days": total_days,
         "daily_fee": per_day_fee,
+        "discount": fee_quote["discount"],
         "total_fee": total_fees,
+        "rate_card": fee_quote["version"],
         "timestamp": datetime.datetime.now().isoformat()
     }
     try:
-        if os.path.exists("payments.json"):
-            with open("payments.json", "r") as f:
-                payments = json.load(f)
+        # Keyed by caretaker, caregiver, skills and dates, so repeat clicks don't add duplicates
+        outcome = save_payment(payment_entry)
+        if outcome == "created":
+            st.success("✅ Payment record saved successfully!")
+        elif outcome == "updated":
+            st.success("✅ Existing payment record updated.")
         else:
-            payments = []
-
-        payments.append(payment_entry)
-
-        with open("payments.json", "w") as f:
-            json.dump(payments, f, indent=2)
-
-        st.success("✅ Payment record saved successfully!")
+            st.info("This payment record is already saved.")
     except Exception as e:
         st.error(f"Error saving payment record: {e}")
 
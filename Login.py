@@ -1,8 +1,11 @@
 import streamlit as st
-import json
-import os
+
+from profiling import profile_page
+from store import find_user
 
 # ----- Setup -----
+profile_page(__file__)
+
 st.set_page_config(page_title="Login Portal", layout="centered")
 
 st.markdown(
@@ -10,14 +13,6 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-file_path = "users.json"
-
-def load_users():
-    if os.path.exists(file_path):
-        with open(file_path, "r") as f:
-            return json.load(f)
-    return []
-
 # ----- Role Selection -----
 default_role = st.session_state.get("preferred_role", "Caretaker")
 role = st.radio(
@@ -43,14 +38,9 @@ with st.form(key="login_form"):
     login_btn = st.form_submit_button("Login")
 
 if login_btn:
-    users = load_users()
-    matched = next(
-        (user
-            for user in users
-            if user["username"] == username and user["password"] == password and user["role"] == role
-        ),
-        None,
-    )
+    # Directory lookup: only the user's own location shard is read
+    user = find_user(username)
+    matched = user if user and user["password"] == password and user["role"] == role else None
 
     if matched:
         st.success(f"✅ Welcome back, {matched.get('name', matched['username'])}!")
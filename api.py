@@ -0,0 +1,296 @@
+"""Lightweight JSON API over the same data stores as the Streamlit pages.
+
+Run with:  python api.py --port 8765
+
+Every GET response carries an ETag derived from the underlying store
+versions, so clients sending If-None-Match get a bodyless 304 when
+nothing they can see has changed.
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import secrets
+from urllib.parse import parse_qs, urlsplit
+
+from changes import changes_since, last_record, last_seq, pruned_after, store_name, task_id
+from inbox import conversations, inbox_store, mark_read, send_message
+from models import ChatMessage, Task
+from reliability import update_task
+from scheduler import parse_due
+from store import UNPLACED, find_user, payments_store, shard_store, user_shards
+
+STATUSES = ["Pending", "Completed", "Missed"]
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 304: "Not Modified", 400: "Bad Request", 401: "Unauthorized",
+           403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 410: "Gone", 500: "Internal Server Error"}
+
+sessions = {}  # token -> user record without password
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ---------- Helpers ----------
+def public_user(u):
+    return {k: v for k, v in u.items() if k != "password"}
+
+
+def user_stores(user, name):
+    """The shard stores holding this user's records of one kind."""
+    return [shard_store(name, shard) for shard in user_shards(user["username"])]
+
+
+def chat_store(user, other):
+    """Chat between a caretaker and a caregiver lives in the caretaker's shard."""
+    caretaker = user["username"] if user["role"] == "Caretaker" else other
+    shards = user_shards(caretaker) or user_shards(user["username"]) or [UNPLACED]
+    return shard_store("chat", shards[0])
+
+
+def partners(user):
+    """Usernames this user is assigned with, in either direction."""
+    username = user["username"]
+    assignments = [a for store in user_stores(user, "assignments") for a in store.load()]
+    return {a.get("caregiver") for a in assignments if a.get("caretaker") == username} | \
+           {a.get("caretaker") for a in assignments if a.get("caregiver") == username}
+
+
+def user_inboxes(user):
+    """The user's inbox stores, one per chat shard they take part in."""
+    return [inbox_store(store, user["username"]) for store in user_stores(user, "chat")]
+
+
+def own_field(user):
+    return "caregiver" if user["role"] == "Caregiver" else "caretaker"
+
+
+def store_etag(user, target, stores):
+    key = "|".join([user["username"], target] + [s.etag() for s in stores])
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+# ---------- Handlers ----------
+def login(user, query, body):
+    matched = find_user(body.get("username"))
+    if not matched or matched.get("password") != body.get("password") \
+            or matched.get("role") != body.get("role", matched.get("role")):
+        raise ApiError(401, "Invalid credentials or role mismatch.")
+    token = secrets.token_urlsafe(24)
+    sessions[token] = public_user(matched)
+    return 200, {"token": token, "user": sessions[token]}
+
+
+def my_tasks(user, query, body):
+    field = own_field(user)
+    # Shared slotted records decoded once per file version; only the matches become dicts
+    tasks = [t for store in user_stores(user, "tasks") for t in store.load_models(Task)]
+    return 200, [dict(t.to_dict(), id=task_id(t)) for t in tasks if t.get(field) == user["username"]]
+
+
+def update_task_status(user, query, body, tid):
+    status = body.get("status")
+    if status not in STATUSES:
+        raise ApiError(400, f"status must be one of {STATUSES}")
+
+    def apply(tasks):
+        t = next((t for t in tasks if task_id(t) == tid and t.get("caregiver") == user["username"]), None)
+        if t is not None:
+            before = dict(t)
+            due = parse_due(t)
+            if status != "Pending" and due and due < datetime.datetime.now():
+                t["overdue"] = True
+            t["status"] = status
+            t["reason"] = body.get("reason", "") if status == "Missed" else ""
+            return before, dict(t, id=task_id(t))
+
+    if user["role"] != "Caregiver":
+        raise ApiError(403, "Only caregivers update task status.")
+    for store in user_stores(user, "tasks"):
+        if any(task_id(t) == tid for t in store.load()):
+            updated = update_task(store, apply)
+            if updated:
+                return 200, updated[1]
+    raise ApiError(404, "Task not found.")
+
+
+def chat_poll(user, query, body):
+    other = query.get("with", [""])[0]
+    since = query.get("since", [""])[0]
+    chat = chat_store(user, other).load_models(ChatMessage)
+    return 200, [
+        c.to_dict() for c in chat
+        if {c.get("from"), c.get("to")} == {user["username"], other} and c.get("timestamp", "") > since
+    ]
+
+
+def chat_send(user, query, body):
+    to, message = body.get("to", ""), str(body.get("message", "")).strip()
+    if not message:
+        raise ApiError(400, "message is required")
+    if to not in partners(user):
+        raise ApiError(403, "You can only message your assigned caretaker/caregivers.")
+    entry = {
+        "from": user["username"],
+        "to": to,
+        "message": message,
+        "timestamp": datetime.datetime.now().isoformat()
+    }
+    send_message(chat_store(user, to), entry)
+    return 201, entry
+
+
+def my_inbox(user, query, body):
+    """Conversations with unread counts and last-message summaries, most recent first."""
+    return 200, [{"with": other, **entry} for other, entry in conversations(user["username"], user_shards(user["username"]))]
+
+
+def read_conversation(user, query, body, other):
+    mark_read(chat_store(user, other), user["username"], other)
+    return 204, None
+
+
+def my_payments(user, query, body):
+    field = own_field(user)
+    return 200, [p for p in payments_store().load() if p.get(field) == user["username"]]
+
+
+def my_changes(user, query, body):
+    """Change-feed events after ?since=<seq> touching this user's tasks, chat and payments."""
+    try:
+        since = int(query.get("since", ["0"])[0])
+    except ValueError:
+        raise ApiError(400, "since must be an integer sequence number")
+    if pruned_after(since):
+        raise ApiError(410, "since is older than the retained change log; reload and resume from the current seq")
+    stores = [store_name(s.path) for name in ("tasks", "chat") for s in user_stores(user, name)]
+    stores.append(store_name(payments_store().path))
+    me = user["username"]
+
+    def mine(record):
+        return bool(record) and me in (record.get(k) for k in ("caretaker", "caregiver", "from", "to"))
+
+    # Deletes carry no record; they belong to whoever owned the record's last logged version
+    events = [
+        e for e in changes_since(since, stores)
+        if mine(e["record"] if e["op"] != "delete" else last_record(e["store"], e["id"]))
+    ]
+    return 200, {"seq": last_seq(), "events": events}
+
+
+# (method, path segments with "{}" wildcards, handler, stores read for ETag, needs auth)
+ROUTES = [
+    ("POST", ("login",), login, None, False),
+    ("GET", ("tasks",), my_tasks, lambda user, query: user_stores(user, "tasks"), True),
+    ("POST", ("tasks", "{}", "status"), update_task_status, None, True),
+    ("GET", ("chat",), chat_poll, lambda user, query: [chat_store(user, query.get("with", [""])[0])], True),
+    ("POST", ("chat",), chat_send, None, True),
+    ("GET", ("inbox",), my_inbox, lambda user, query: user_inboxes(user), True),
+    ("POST", ("inbox", "{}", "read"), read_conversation, None, True),
+    ("GET", ("payments",), my_payments, lambda user, query: [payments_store()], True),
+    ("GET", ("changes",), my_changes, None, True),
+]
+
+
+def route(method, path):
+    segments = tuple(s for s in path.split("/") if s)
+    allowed = False
+    for r_method, pattern, handler, stores, auth in ROUTES:
+        if len(pattern) != len(segments):
+            continue
+        if all(p == "{}" or p == s for p, s in zip(pattern, segments)):
+            args = [s for p, s in zip(pattern, segments) if p == "{}"]
+            if r_method == method:
+                return handler, stores, auth, args
+            allowed = True
+    raise ApiError(405 if allowed else 404, "Method not allowed." if allowed else "Not found.")
+
+
+def dispatch(method, target, headers, raw_body):
+    """Returns (status, payload or None, extra headers)."""
+    url = urlsplit(target)
+    handler, stores, auth, args = route(method, url.path)
+
+    user = None
+    if auth:
+        token = headers.get("authorization", "").removeprefix("Bearer ").strip()
+        user = sessions.get(token)
+        if not user:
+            raise ApiError(401, "Login required.")
+
+    extra = {}
+    query = parse_qs(url.query)
+    if method == "GET" and stores:
+        etag = store_etag(user, target, stores(user, query))
+        extra["ETag"] = etag
+        if etag in [t.strip() for t in headers.get("if-none-match", "").split(",")]:
+            return 304, None, extra
+
+    try:
+        body = json.loads(raw_body) if raw_body else {}
+    except ValueError:
+        raise ApiError(400, "Body must be JSON.")
+    status, payload = handler(user, query, body, *args)
+    return status, payload, extra
+
+
+# ---------- HTTP Server ----------
+async def handle_connection(reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            raw_body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+
+            try:
+                # Store access is blocking file IO; keep it off the event loop
+                status, payload, extra = await asyncio.to_thread(dispatch, method, target, headers, raw_body)
+            except ApiError as e:
+                status, payload, extra = e.status, {"error": str(e)}, {}
+            except Exception as e:
+                status, payload, extra = 500, {"error": f"{type(e).__name__}: {e}"}, {}
+
+            data = b"" if payload is None else json.dumps(payload).encode()
+            keep_alive = headers.get("connection", "").lower() != "close"
+            response = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+            response += [f"{k}: {v}" for k, v in extra.items()]
+            response += [
+                "Content-Type: application/json",
+                f"Content-Length: {len(data)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            ]
+            writer.write(("\r\n".join(response) + "\r\n\r\n").encode() + data)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host, port):
+    server = await asyncio.start_server(handle_connection, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Senior Hygiene Caretaker JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    print(f"Serving API on http://{args.host}:{args.port}")
+    asyncio.run(serve(args.host, args.port))
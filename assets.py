@@ -0,0 +1,124 @@
+"""Resized, compressed, content-hashed variants of the page images.
+
+Build (re-run after changing an image; unchanged sources are skipped):
+
+    python assets.py build
+
+Pages then call asset_bytes(name, display_width) to get the smallest
+variant that is still sharp at that width, read once per process. Variants
+are WebP only: every browser Streamlit supports displays it, and the page
+has no way to learn what a given browser accepts.
+Without a build, the original file is served as before.
+"""
+import hashlib
+import io
+import json
+import os
+import sys
+from functools import lru_cache
+
+SOURCES = {
+    "logo": "assets/logo..png",
+    "banner": "assets/banner3.jpg",
+}
+WIDTHS = (320, 640, 1280, 1920)
+BUILD_DIR = "assets/build"
+MANIFEST = os.path.join(BUILD_DIR, "manifest.json")
+# Variants are served at up to twice their CSS width for high-density screens
+PIXEL_RATIO = 2
+FORMAT = "webp"
+
+
+# ---------- Build ----------
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _encode(image):
+    out = io.BytesIO()
+    image.save(out, "WEBP", quality=80, method=6)
+    return out.getvalue()
+
+
+def build():
+    from PIL import Image  # installed with streamlit; only needed at build time
+
+    manifest = json.load(open(MANIFEST)) if os.path.exists(MANIFEST) else {}
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    for name, source in SOURCES.items():
+        if not os.path.exists(source):
+            print(f"skip {name}: {source} not found")
+            continue
+        source_hash = _file_hash(source)
+        built = manifest.get(name, {})
+        if built.get("source_hash") == source_hash and all(v["format"] == FORMAT for v in built["variants"]):
+            print(f"skip {name}: unchanged")
+            continue
+
+        image = Image.open(source)
+        image.load()
+        widths = [w for w in WIDTHS if w < image.width] + [image.width]
+        variants = []
+        for width in widths:
+            resized = image if width == image.width else image.resize(
+                (width, round(image.height * width / image.width)), Image.LANCZOS)
+            data = _encode(resized)
+            digest = hashlib.sha256(data).hexdigest()[:10]
+            path = os.path.join(BUILD_DIR, f"{name}-{width}.{digest}.{FORMAT}")
+            with open(path, "wb") as f:
+                f.write(data)
+            variants.append({"width": width, "format": FORMAT, "path": path, "bytes": len(data)})
+            print(f"{path}: {len(data) / 1024:.0f} KiB")
+
+        for old in manifest.get(name, {}).get("variants", []):
+            if old["path"] not in {v["path"] for v in variants} and os.path.exists(old["path"]):
+                os.remove(old["path"])
+        manifest[name] = {"source_hash": source_hash, "variants": variants}
+
+    with open(MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+# ---------- Loading ----------
+@lru_cache(maxsize=None)
+def _manifest(mtime):
+    return json.load(open(MANIFEST))
+
+
+@lru_cache(maxsize=64)
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def asset_path(name, display_width):
+    """Path of the smallest built variant covering display_width, else the original file."""
+    if not os.path.exists(MANIFEST):
+        return SOURCES[name]
+    variants = _manifest(os.stat(MANIFEST).st_mtime_ns).get(name, {}).get("variants", [])
+    needed = display_width * PIXEL_RATIO
+    candidates = [v for v in variants if v["format"] == FORMAT and os.path.exists(v["path"])]
+    if not candidates:
+        return SOURCES[name]
+    big_enough = [v for v in candidates if v["width"] >= needed]
+    pick = min(big_enough, key=lambda v: v["width"]) if big_enough else max(candidates, key=lambda v: v["width"])
+    return pick["path"]
+
+
+def asset_bytes(name, display_width):
+    """Image bytes for st.image, cached in process memory.
+
+    Built paths are content-hashed, so a rebuilt image gets a new cache entry.
+    """
+    path = asset_path(name, display_width)
+    if path == SOURCES[name]:
+        return path  # unbuilt original: let st.image read the file as before
+    return _read(path)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["build"]:
+        build()
+    else:
+        print(__doc__)
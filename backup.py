@@ -0,0 +1,264 @@
+"""Incremental snapshot backups of the data stores, with point-in-time restore.
+
+    python backup.py snapshot                 # take a snapshot (safe while the app runs)
+    python backup.py list                     # snapshots, oldest first
+    python backup.py restore <id | ISO time>  # restore the latest snapshot at or before a time
+
+Records are stored once each under backups/objects, compressed and named
+by the SHA-256 of their JSON. A snapshot manifest only describes what
+changed since its parent snapshot: for each changed file, the records
+replaced between an unchanged prefix and suffix (list files) or the keys
+set and deleted (dict files). Unchanged files are neither read nor listed.
+Every FULL_EVERY-th snapshot lists every file in full, so restoring walks
+at most that many manifests.
+"""
+import datetime
+import glob
+import hashlib
+import json
+import os
+import sys
+import zlib
+
+from changes import last_seq
+from reliability import RELIABILITY_FILE
+from store import DATA_FILES, DIRECTORY_FILE, SHARD_ROOT, get_store
+
+BACKUP_DIR = "backups"
+OBJECT_DIR = os.path.join(BACKUP_DIR, "objects")
+SNAPSHOT_DIR = os.path.join(BACKUP_DIR, "snapshots")
+# Derived from the stores above; removed on restore so they are rebuilt to match
+DERIVED_FILES = [os.path.join(SHARD_ROOT, "*", RELIABILITY_FILE), os.path.join(SHARD_ROOT, "*", "inbox", "*.json")]
+MAX_ATTEMPTS = 5
+FULL_EVERY = 50
+
+
+# ---------- Objects ----------
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _object_path(digest):
+    return os.path.join(OBJECT_DIR, digest[:2], digest[2:] + ".z")
+
+
+def put_object(record, known=frozenset()):
+    """Store one record, once per distinct content; returns its hash.
+
+    Hashes in `known` are already stored (they were in the previous
+    version of the file), so they skip the existence check.
+    """
+    raw = json.dumps(record).encode()
+    digest = hashlib.sha256(raw).hexdigest()
+    if digest not in known:
+        path = _object_path(digest)
+        if not os.path.exists(path):
+            _write_atomic(path, zlib.compress(raw, 9))
+    return digest
+
+
+def get_object(digest):
+    with open(_object_path(digest), "rb") as f:
+        return json.loads(zlib.decompress(f.read()))
+
+
+# ---------- Deltas ----------
+def _delta(old, new):
+    """Change from one version of a file's record hashes to the next."""
+    if isinstance(new, dict):
+        old = old if isinstance(old, dict) else {}
+        return {"set": {k: v for k, v in new.items() if old.get(k) != v},
+                "delete": [k for k in old if k not in new]}
+    old = old if isinstance(old, list) else []
+    prefix = 0
+    while prefix < min(len(old), len(new)) and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < min(len(old), len(new)) - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return {"prefix": prefix, "suffix": suffix, "middle": new[prefix:len(new) - suffix]}
+
+
+def _apply_delta(old, delta):
+    if "set" in delta:
+        records = dict(old) if isinstance(old, dict) else {}
+        records.update(delta["set"])
+        for key in delta["delete"]:
+            records.pop(key, None)
+        return records
+    old = old if isinstance(old, list) else []
+    return old[:delta["prefix"]] + delta["middle"] + old[len(old) - delta["suffix"]:]
+
+
+# ---------- Snapshots ----------
+def data_files():
+    """Every store file to back up: the flat files, all shard files and the shard directory."""
+    files = list(DATA_FILES.values()) + [DIRECTORY_FILE]
+    derived = {path for pattern in DERIVED_FILES for path in glob.glob(pattern)}
+    files += sorted(set(glob.glob(os.path.join(SHARD_ROOT, "*", "*.json"))) - derived)
+    return [f.replace(os.sep, "/") for f in files if os.path.exists(f)]
+
+
+def _signature(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _capture(path, previous):
+    """{"signature", "records"} for one file, reusing the previous one when the file is untouched."""
+    signature = _signature(path)
+    if previous and previous["signature"] == signature:
+        return previous
+    old = (previous or {}).get("records") or []
+    known = frozenset(old.values() if isinstance(old, dict) else old)
+    with open(path, "rb") as f:
+        data = json.loads(f.read() or b"null")
+    if isinstance(data, dict):
+        records = {key: put_object(value, known) for key, value in data.items()}
+    else:
+        records = [put_object(record, known) for record in data or []]
+    return {"signature": signature, "records": records}
+
+
+def snapshots():
+    """Snapshot manifests, oldest first."""
+    manifests = []
+    for path in sorted(glob.glob(os.path.join(SNAPSHOT_DIR, "*.json.z"))):
+        with open(path, "rb") as f:
+            manifests.append(json.loads(zlib.decompress(f.read())))
+    return manifests
+
+
+def _chain(history, manifest):
+    """Manifests from the last full snapshot up to and including `manifest`."""
+    by_id = {m["id"]: m for m in history}
+    chain = [manifest]
+    while not chain[-1]["full"]:
+        chain.append(by_id[chain[-1]["parent"]])
+    return chain[::-1]
+
+
+def _resolve(chain):
+    """{path: {"signature", "records"}} as of the last manifest of a chain."""
+    state = {}
+    for m in chain:
+        for path in m["removed"]:
+            state.pop(path, None)
+        for path, entry in m["files"].items():
+            old = state.get(path, {}).get("records")
+            state[path] = {"signature": entry["signature"], "records": _apply_delta(old, entry["delta"])}
+    return state
+
+
+def snapshot():
+    """Take a snapshot without blocking writers.
+
+    Files are read while the app keeps running. If the change log or any file
+    moved during the pass, the changed files are captured again, so the
+    snapshot is one consistent cut. After MAX_ATTEMPTS busy passes it is
+    kept but marked inconsistent.
+    """
+    history = snapshots()
+    parent = history[-1] if history else None
+    chain = _chain(history, parent) if parent else []
+    state = _resolve(chain)
+    full = len(chain) in (0, FULL_EVERY)
+
+    files = {}
+    consistent = False
+    for _ in range(MAX_ATTEMPTS):
+        seq = last_seq()
+        files = {path: _capture(path, files.get(path) or state.get(path)) for path in data_files()}
+        stable = all(os.path.exists(p) and _signature(p) == e["signature"] for p, e in files.items())
+        if stable and set(files) == set(data_files()) and last_seq() == seq:
+            consistent = True
+            break
+
+    base = {} if full else state
+    changed = {
+        path: {"signature": entry["signature"],
+               "delta": _delta((base.get(path) or {}).get("records"), entry["records"])}
+        for path, entry in files.items() if base.get(path) is not entry
+    }
+    taken_at = datetime.datetime.now()
+    manifest = {
+        "id": taken_at.strftime("%Y%m%d-%H%M%S-%f"),
+        "parent": parent["id"] if parent else None,
+        "full": full,
+        "taken_at": taken_at.isoformat(),
+        "seq": seq,
+        "consistent": consistent,
+        "files": changed,
+        "removed": [] if full else [path for path in state if path not in files],
+    }
+    _write_atomic(os.path.join(SNAPSHOT_DIR, manifest["id"] + ".json.z"),
+                  zlib.compress(json.dumps(manifest).encode(), 9))
+    return manifest
+
+
+# ---------- Restore ----------
+def find_snapshot(when, history=None):
+    """Snapshot by id, or the latest one taken at or before an ISO date/time."""
+    history = snapshots() if history is None else history
+    exact = [m for m in history if m["id"] == when]
+    if exact:
+        return exact[0]
+    at = datetime.datetime.fromisoformat(when).isoformat()
+    before = [m for m in history if m["taken_at"] <= at]
+    return before[-1] if before else None
+
+
+def restore(manifest, history=None):
+    """Rewrite every store file to its snapshot contents.
+
+    Goes through the stores' atomic save, so running pages and the API
+    pick up the restored data and its change-feed events. Files created
+    after the snapshot are emptied.
+    """
+    state = _resolve(_chain(snapshots() if history is None else history, manifest))
+    for path in data_files():
+        if path not in state:
+            store = get_store(path, empty=b"{}" if path == DIRECTORY_FILE else b"[]")
+            store.save({} if path == DIRECTORY_FILE else [])
+    for path, entry in state.items():
+        records = entry["records"]
+        if isinstance(records, dict):
+            data = {key: get_object(digest) for key, digest in records.items()}
+        else:
+            data = [get_object(digest) for digest in records]
+        get_store(path).save(data, indent=4 if os.path.basename(path) == "users.json" else 2)
+    for pattern in DERIVED_FILES:
+        for path in glob.glob(pattern):
+            os.remove(path)
+
+
+# ---------- CLI ----------
+def main(argv):
+    command = argv[0] if argv else ""
+    if command == "snapshot":
+        m = snapshot()
+        kind = "full" if m["full"] else f"{len(m['files'])} changed files, {len(m['removed'])} removed"
+        print(f"snapshot {m['id']}: {kind}"
+              + ("" if m["consistent"] else " (writes kept arriving; may be inconsistent)"))
+    elif command == "list":
+        for m in snapshots():
+            kind = "full" if m["full"] else f"{len(m['files'])} changed"
+            flag = "" if m["consistent"] else "  inconsistent"
+            print(f"{m['id']}  {m['taken_at']}  seq {m['seq']}  {kind}{flag}")
+    elif command == "restore" and len(argv) == 2:
+        history = snapshots()
+        m = find_snapshot(argv[1], history)
+        if not m:
+            sys.exit(f"No snapshot at or before {argv[1]}")
+        restore(m, history)
+        print(f"restored snapshot {m['id']} ({m['taken_at']})")
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+# SQLite gives one ordered sequence across the Streamlit and API processes
+CHANGE_LOG = "changes.db"
+# Only the most recent events are kept; readers left behind by pruning reload instead
+RETAIN_EVENTS = 100000
+PRUNE_EVERY = 1000
+
+_conn = None
+_conn_lock = threading.Lock()
+_subscribers = []
+
+
+# ---------- Record Identity ----------
+def task_id(t):
+    """Stable identifier of a task record."""
+    return t.get("id") or t.get("created_at")
+
+
+def payment_key(p):
+    """Idempotency key of a payment: the same caretaker, caregiver, skills and period."""
+    parts = [p.get("caretaker"), p.get("caregiver"), ",".join(sorted(p.get("skills") or [])),
+             p.get("start_date"), p.get("end_date")]
+    return hashlib.sha1("|".join(str(x or "") for x in parts).encode()).hexdigest()[:16]
+
+
+def payment_id(p):
+    """Stable identifier of a payment record; older records predate the stored id."""
+    return p.get("id") or payment_key(p)
+
+
+RECORD_KEYS = {
+    "users.json": lambda u: u.get("username"),
+    "assigned_tasks.json": task_id,
+    "assignments.json": lambda a: "|".join(
+        str(a.get(k) or "") for k in ("caretaker", "caregiver", "joining_date")),
+    "chat.json": lambda c: "|".join(str(c.get(k) or "") for k in ("from", "to", "timestamp")),
+    "payments.json": payment_id,
+}
+
+
+def record_ids(path, data):
+    """{record id: record} for a store's data; dict stores are keyed already."""
+    if isinstance(data, dict):
+        return dict(data)
+    key_of = RECORD_KEYS.get(os.path.basename(path))
+    ids = {}
+    for record in data:
+        rid = key_of(record) if key_of else None
+        rid = rid or hashlib.sha1(json.dumps(record, sort_keys=True).encode()).hexdigest()[:16]
+        n, unique = 1, rid
+        while unique in ids:
+            n += 1
+            unique = f"{rid}#{n}"
+        ids[unique] = record
+    return ids
+
+
+def diff(path, old, new):
+    """[(op, record id, record)] turning old into new; op is insert/update/delete."""
+    return diff_ids(record_ids(path, old), record_ids(path, new))
+
+
+def diff_ids(before, after):
+    """diff() over {record id: record} maps already built with record_ids()."""
+    changes = [("delete", rid, None) for rid in before if rid not in after]
+    for rid, record in after.items():
+        if rid not in before:
+            changes.append(("insert", rid, record))
+        elif before[rid] != record:
+            changes.append(("update", rid, record))
+    return changes
+
+
+# ---------- Change Log ----------
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(CHANGE_LOG, timeout=10, check_same_thread=False)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS changes ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, store TEXT, record_id TEXT, op TEXT, record TEXT)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS changes_store ON changes (store, seq)")
+    return _conn
+
+
+def store_name(path):
+    """Store identifier used in events: the file path relative to the app directory."""
+    return os.path.relpath(path).replace(os.sep, "/")
+
+
+def emit(path, changes):
+    """Append changes for one store to the log and notify in-process subscribers."""
+    if not changes:
+        return []
+    store = store_name(path)
+    with _conn_lock:
+        db = _db()
+        with db:
+            events = []
+            for op, rid, record in changes:
+                cur = db.execute(
+                    "INSERT INTO changes (store, record_id, op, record) VALUES (?, ?, ?, ?)",
+                    (store, rid, op, None if record is None else json.dumps(record)),
+                )
+                events.append({"seq": cur.lastrowid, "store": store, "id": rid, "op": op, "record": record})
+            if any(e["seq"] % PRUNE_EVERY == 0 for e in events):
+                db.execute("DELETE FROM changes WHERE seq <= ?", (events[-1]["seq"] - RETAIN_EVENTS,))
+    for stores, callback in list(_subscribers):
+        for event in events:
+            if stores is None or event["store"] in stores:
+                callback(event)
+    return events
+
+
+def changes_since(seq, stores=None):
+    """Events with sequence number > seq, oldest first, optionally for some stores only."""
+    query = "SELECT seq, store, record_id, op, record FROM changes WHERE seq > ?"
+    args = [seq]
+    if stores is not None:
+        stores = list(stores)
+        query += f" AND store IN ({','.join('?' * len(stores))})"
+        args += stores
+    with _conn_lock:
+        rows = _db().execute(query + " ORDER BY seq", args).fetchall()
+    return [
+        {"seq": s, "store": store, "id": rid, "op": op, "record": json.loads(record) if record else None}
+        for s, store, rid, op, record in rows
+    ]
+
+
+def last_record(store, record_id):
+    """The most recent body logged for a record, e.g. to see whose record a delete removed."""
+    with _conn_lock:
+        row = _db().execute(
+            "SELECT record FROM changes WHERE store = ? AND record_id = ? AND record IS NOT NULL "
+            "ORDER BY seq DESC LIMIT 1", (store, record_id),
+        ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def pruned_after(seq):
+    """True if events after seq have been pruned, so a reader at seq must reload."""
+    with _conn_lock:
+        db = _db()
+        oldest = db.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+        if oldest is None:
+            row = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+            oldest = (row[0] if row else 0) + 1
+    return seq + 1 < oldest
+
+
+def last_seq():
+    with _conn_lock:
+        return _db().execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+
+def subscribe(callback, stores=None):
+    """Call callback(event) for every change written by this process; returns an unsubscribe function.
+
+    Other processes' writes are picked up with changes_since().
+    """
+    entry = (None if stores is None else set(stores), callback)
+    _subscribers.append(entry)
+    return lambda: _subscribers.remove(entry)
+
+
+# ---------- Live Views ----------
+class LiveView:
+    """In-memory copy of one store kept current by applying change events."""
+
+    def __init__(self, store):
+        self._source = store
+        self.store = store_name(store.path)
+        self._load()
+
+    def _load(self):
+        self.seq = last_seq()
+        self.records = record_ids(self._source.path, self._source.load())
+
+    def refresh(self):
+        """Apply events since the last refresh; returns them.
+
+        A view whose next events were pruned reloads from the store and returns [].
+        """
+        if pruned_after(self.seq):
+            self._load()
+            return []
+        events = changes_since(self.seq, [self.store])
+        for event in events:
+            if event["op"] == "delete":
+                self.records.pop(event["id"], None)
+            else:
+                self.records[event["id"]] = event["record"]
+            self.seq = event["seq"]
+        return events
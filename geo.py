@@ -0,0 +1,135 @@
+import json
+import math
+import os
+import re
+
+gazetteer_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.json")
+
+EARTH_RADIUS_KM = 6371.0
+
+_gazetteer = None
+
+
+# ---------- Gazetteer ----------
+def _key(text):
+    """Normalize free text for lookup: lowercase, no punctuation, single spaces."""
+    text = re.sub(r"[^\w\s]", " ", str(text or "").casefold())
+    return " ".join(text.split())
+
+
+def load_gazetteer():
+    """Return {normalized name/alias: place} built once from the bundled gazetteer."""
+    global _gazetteer
+    if _gazetteer is None:
+        places = json.load(open(gazetteer_path)) if os.path.exists(gazetteer_path) else []
+        index = {}
+        for place in places:
+            for name in [place["name"]] + place.get("aliases", []):
+                index[_key(name)] = place
+        _gazetteer = index
+    return _gazetteer
+
+
+def normalize_location(text):
+    """Resolve a free-text location to {"name", "lat", "lon"}, or None if unknown.
+
+    Tries the whole string first, then each comma-separated part, so
+    "Vijay Nagar, Indore" resolves to Indore.
+    """
+    gazetteer = load_gazetteer()
+    candidates = [text] + str(text or "").split(",")[::-1]
+    for candidate in candidates:
+        place = gazetteer.get(_key(candidate))
+        if place:
+            return {"name": place["name"], "lat": place["lat"], "lon": place["lon"]}
+    return None
+
+
+def user_coords(u):
+    """(lat, lon) for a user record, from stored coordinates or the gazetteer."""
+    if u.get("lat") is not None and u.get("lon") is not None:
+        return float(u["lat"]), float(u["lon"])
+    place = normalize_location(u.get("location", ""))
+    return (place["lat"], place["lon"]) if place else None
+
+
+# ---------- Distance ----------
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _to_xyz(lat, lon):
+    """Unit-sphere point; straight-line distance is monotonic in great-circle distance."""
+    p, l = math.radians(lat), math.radians(lon)
+    return (math.cos(p) * math.cos(l), math.cos(p) * math.sin(l), math.sin(p))
+
+
+def _chord(radius_km):
+    return 2 * math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+# ---------- KD-tree ----------
+class KDTree:
+    """Static 3-d tree over unit-sphere points for radius queries."""
+
+    def __init__(self, points):
+        # points: list of ((x, y, z), payload)
+        self.root = self._build(list(points), 0)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda p: p[0][axis])
+        mid = len(points) // 2
+        return (
+            points[mid],
+            axis,
+            self._build(points[:mid], depth + 1),
+            self._build(points[mid + 1:], depth + 1),
+        )
+
+    def within(self, xyz, chord):
+        """Payloads of all points within straight-line distance `chord` of xyz."""
+        found, stack, r2 = [], [self.root], chord * chord
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            (point, payload), axis, left, right = node
+            if sum((a - b) ** 2 for a, b in zip(point, xyz)) <= r2:
+                found.append(payload)
+            diff = xyz[axis] - point[axis]
+            stack.append(left if diff <= 0 else right)
+            if diff * diff <= r2:
+                stack.append(right if diff <= 0 else left)
+        return found
+
+
+# ---------- Caregiver Matching ----------
+class CaregiverIndex:
+    """Spatial index of caregivers answering "within R km with skills X, Y"."""
+
+    def __init__(self, caregivers, skills_of):
+        self.skills_of = skills_of
+        self.unplaced = []
+        points = []
+        for cg in caregivers:
+            coords = user_coords(cg)
+            if coords:
+                points.append((_to_xyz(*coords), (coords, cg)))
+            else:
+                self.unplaced.append(cg)
+        self.tree = KDTree(points)
+
+    def nearby(self, lat, lon, radius_km, required_skills=()):
+        """[(distance_km, caregiver)] within radius_km having every required skill, nearest first."""
+        results = []
+        for (cg_lat, cg_lon), cg in self.tree.within(_to_xyz(lat, lon), _chord(radius_km)):
+            if all(skill in self.skills_of(cg) for skill in required_skills):
+                results.append((haversine_km(lat, lon, cg_lat, cg_lon), cg))
+        results.sort(key=lambda r: r[0])
+        return results
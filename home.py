@@ -1,6 +1,11 @@
 
 import streamlit as st
 
+from assets import asset_bytes
+from profiling import profile_page
+
+profile_page(__file__)
+
 st.set_page_config(page_title="Senior Hygiene Caretaker", layout="wide")
 
 if "menu_open" not in st.session_state:
@@ -9,7 +14,7 @@ if "menu_open" not in st.session_state:
 header_cols = st.columns([8, 40, 6])
 
 with header_cols[0]:
-    st.image("assets/logo..png", width=150)
+    st.image(asset_bytes("logo", 150), width=150)
 
 with header_cols[1]:
     st.markdown(
@@ -26,7 +31,8 @@ with header_cols[1]:
         unsafe_allow_html=True,
     )
 
-    st.image("assets/banner3.jpg", use_container_width=True)
+    # Column is ~650 CSS px wide in the wide layout
+    st.image(asset_bytes("banner", 650), use_container_width=True)
 
 with header_cols[2]:
     if st.button("🔐 Login"):
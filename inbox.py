@@ -0,0 +1,103 @@
+import datetime
+import os
+import re
+
+from models import ChatMessage
+from store import derived_store, shard_store
+
+INBOX_DIR = "inbox"
+PREVIEW_CHARS = 60
+
+
+# ---------- Conversations ----------
+# Each user has one small {other: {"unread", "last"}} file per chat shard, next to
+# that shard's chat.json, so a send touches only its two participants' files.
+def inbox_path(chat_store, username):
+    name = re.sub(r"[^\w.-]+", "_", username)
+    return os.path.join(os.path.dirname(chat_store.path), INBOX_DIR, f"{name}.json")
+
+
+def _summary(msg):
+    return {"from": msg.get("from"), "message": msg.get("message", ""), "timestamp": msg.get("timestamp", "")}
+
+
+def _apply(inbox, username, msg, count_unread):
+    """Fold one message into username's entry for the other participant."""
+    sender, to = msg.get("from"), msg.get("to")
+    if not sender or not to or username not in (sender, to):
+        return
+    entry = inbox.setdefault(to if username == sender else sender, {"unread": 0, "last": None})
+    if entry["last"] is None or msg.get("timestamp", "") >= entry["last"]["timestamp"]:
+        entry["last"] = _summary(msg)
+    if count_unread and username == to:
+        entry["unread"] += 1
+
+
+def _builder(chat_store, username):
+    """Summaries from a shard's chat history. Read state was never stored before, so it counts as read."""
+    def build():
+        inbox = {}
+        for msg in chat_store.load_models(ChatMessage):
+            _apply(inbox, username, msg, count_unread=False)
+        return inbox
+
+    return build
+
+
+def inbox_store(chat_store, username):
+    """One user's conversations within a chat shard, built from its history the first time."""
+    return derived_store(inbox_path(chat_store, username), _builder(chat_store, username))
+
+
+def send_message(chat_store, msg):
+    """Append a message to chat_store and fold it into both participants' inboxes.
+
+    The inboxes are built from history before the append, so a recipient's
+    first message is counted as unread instead of as part of the build.
+    """
+    inboxes = {username: inbox_store(chat_store, username) for username in {msg.get("from"), msg.get("to")} - {None}}
+    chat_store.update(lambda chat: chat.append(msg))
+    for username, store in inboxes.items():
+        store.update(lambda inbox, username=username: _apply(inbox, username, msg, count_unread=True))
+
+
+def mark_read(chat_store, username, other):
+    """Clear the unread counter of one conversation; no write when already read."""
+    store = inbox_store(chat_store, username)
+    if not store.load().get(other, {}).get("unread"):
+        return
+
+    def apply(inbox):
+        if other in inbox:
+            inbox[other]["unread"] = 0
+
+    store.update(apply)
+
+
+def conversations(username, shard_names):
+    """[(other, {"unread", "last"})] across the user's chat shards, most recent first."""
+    mine = {}
+    for shard in shard_names:
+        mine.update(inbox_store(shard_store("chat", shard), username).load())
+    return sorted(mine.items(), key=lambda c: (c[1]["last"] or {}).get("timestamp", ""), reverse=True)
+
+
+# ---------- Display ----------
+def preview(entry, username):
+    """One-line summary of a conversation's last message."""
+    last = entry.get("last")
+    if not last:
+        return "No messages yet"
+    text = " ".join(last["message"].split())
+    if len(text) > PREVIEW_CHARS:
+        text = text[:PREVIEW_CHARS - 1] + "…"
+    who = "You: " if last["from"] == username else ""
+    try:
+        when = datetime.datetime.fromisoformat(last["timestamp"]).strftime("%d %b, %I:%M %p")
+    except ValueError:
+        when = ""
+    return f"{who}{text}" + (f" · {when}" if when else "")
+
+
+def badge(entry):
+    return f" 🔴 {entry['unread']} new" if entry and entry.get("unread") else ""
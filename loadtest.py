@@ -0,0 +1,266 @@
+"""Concurrent-session load test with lost-write reconciliation.
+
+Each simulated session is a caretaker/caregiver pair, run as one thread
+of this process the way Streamlit runs page sessions. Per iteration it
+logs both in, sends a chat message each way, assigns a task and marks it
+Completed, through the same helpers the dashboards call (find_user,
+send_message, add_task, update_task). Afterwards every expected record
+is looked up in the stores, and each conversation's unread count must
+equal the messages sent in it, since nothing in the run marks one read.
+
+    python loadtest.py --sessions 20 --iterations 10              # page code paths, one thread per session
+    python loadtest.py --sessions 20 --iterations 10 --mode api   # HTTP against a local api.py
+
+Runs in a scratch data directory, never against the app's own data.
+"""
+import argparse
+import collections
+import datetime
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+CITIES = ["Indore", "Hyderabad", "Mumbai", "Pune", "Delhi", "Bengaluru", "Chennai", "Kolkata"]
+PASSWORD = "Load@1234"
+
+
+# ---------- Setup ----------
+def setup(sessions, cities):
+    from store import add_user, link_shard, shard_key, shard_store
+
+    for i in range(sessions):
+        city = CITIES[i % cities]
+        caretaker, caregiver = f"ct_{i}", f"cg_{i}"
+        add_user({"username": caretaker, "password": PASSWORD, "role": "Caretaker", "location": city, "name": caretaker})
+        add_user({"username": caregiver, "password": PASSWORD, "role": "Caregiver", "location": city,
+                  "skills": "Bathing, Feeding", "name": caregiver})
+        shard = shard_key(city)
+        shard_store("assignments", shard).update(lambda a: a.append(
+            {"caretaker": caretaker, "caregiver": caregiver, "duration": "1 Month", "status": "Active"}))
+        link_shard(caregiver, shard)
+
+
+# ---------- Sessions ----------
+def _timed(latencies, op, fn, *args):
+    """Run one operation, recording its latency; failures are counted under "<op> errors"."""
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+    except Exception:
+        latencies.setdefault(f"{op} errors", []).append(time.perf_counter() - start)
+        return None
+    latencies.setdefault(op, []).append(time.perf_counter() - start)
+    return result
+
+
+def store_session(i, iterations):
+    """One session making the dashboards' own store calls."""
+    from changes import task_id
+    from inbox import send_message
+    from reliability import add_task, update_task
+    from scheduler import parse_due
+    from store import find_user, shard_store, user_shards
+
+    caretaker, caregiver = f"ct_{i}", f"cg_{i}"
+    latencies, expected = {}, {"chat": [], "tasks": {}}
+
+    def login(username):
+        u = find_user(username)
+        assert u and u["password"] == PASSWORD
+
+    def send(sender, to):
+        msg = {"from": sender, "to": to, "message": uuid.uuid4().hex,
+               "timestamp": datetime.datetime.now().isoformat()}
+        send_message(shard_store("chat", user_shards(caretaker)[0]), msg)
+        expected["chat"].append((sender, to, msg["message"]))
+
+    def assign():
+        task = {"id": uuid.uuid4().hex, "caretaker": caretaker, "caregiver": caregiver, "task": "Bathing",
+                "skill": "Bathing", "time": "09:00 AM", "status": "Pending", "reason": "",
+                "created_at": datetime.datetime.now().isoformat()}
+        add_task(shard_store("tasks", user_shards(caretaker)[0]), task)
+        expected["tasks"][task["id"]] = "Pending"
+        return task["id"]
+
+    def complete(tid):
+        def apply(tasks):
+            t = next((t for t in tasks if task_id(t) == tid), None)
+            if t is None:
+                return None
+            before = dict(t)
+            due = parse_due(t)
+            if due and due < datetime.datetime.now():
+                t["overdue"] = True
+            t["status"] = "Completed"
+            t["reason"] = ""
+            return before, dict(t)
+
+        update_task(shard_store("tasks", user_shards(caregiver)[0]), apply)
+        expected["tasks"][tid] = "Completed"
+
+    for _ in range(iterations):
+        _timed(latencies, "login", login, caretaker)
+        _timed(latencies, "chat_send", send, caretaker, caregiver)
+        tid = _timed(latencies, "task_assign", assign)
+        _timed(latencies, "login", login, caregiver)
+        if tid:
+            _timed(latencies, "status_update", complete, tid)
+        _timed(latencies, "chat_send", send, caregiver, caretaker)
+    return latencies, expected
+
+
+def api_session(i, iterations, base):
+    """One session over HTTP; tasks are assigned through the store since the API has no assign call."""
+    from reliability import add_task
+    from store import shard_store, user_shards
+
+    caretaker, caregiver = f"ct_{i}", f"cg_{i}"
+    latencies, expected = {}, {"chat": [], "tasks": {}}
+
+    def call(method, path, body=None, token=None):
+        req = urllib.request.Request(base + path, method=method, data=json.dumps(body or {}).encode())
+        if token:
+            req.add_header("Authorization", f"Bearer {token}")
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return json.loads(resp.read() or b"null")
+
+    def send(token, sender, to):
+        message = uuid.uuid4().hex
+        call("POST", "/chat", {"to": to, "message": message}, token)
+        expected["chat"].append((sender, to, message))
+
+    def assign():
+        tid = uuid.uuid4().hex
+        add_task(shard_store("tasks", user_shards(caretaker)[0]),
+                 {"id": tid, "caretaker": caretaker, "caregiver": caregiver, "task": "Bathing", "time": "09:00 AM",
+                  "status": "Pending", "reason": "", "created_at": datetime.datetime.now().isoformat()})
+        expected["tasks"][tid] = "Pending"
+        return tid
+
+    def complete(token, tid):
+        call("POST", f"/tasks/{tid}/status", {"status": "Completed"}, token)
+        expected["tasks"][tid] = "Completed"
+
+    for _ in range(iterations):
+        ct_token = (_timed(latencies, "login", call, "POST", "/login",
+                           {"username": caretaker, "password": PASSWORD}) or {}).get("token")
+        _timed(latencies, "chat_send", send, ct_token, caretaker, caregiver)
+        tid = _timed(latencies, "task_assign", assign)
+        cg_token = (_timed(latencies, "login", call, "POST", "/login",
+                           {"username": caregiver, "password": PASSWORD}) or {}).get("token")
+        if tid:
+            _timed(latencies, "status_update", complete, cg_token, tid)
+        _timed(latencies, "chat_send", send, cg_token, caregiver, caretaker)
+    return latencies, expected
+
+
+# ---------- Reconciliation & Report ----------
+def reconcile(results):
+    from inbox import conversations
+    from store import shard_store, shards, user_shards
+
+    chat = {c.get("message") for s in shards() for c in shard_store("chat", s).load()}
+    tasks = {t.get("id"): t.get("status") for s in shards() for t in shard_store("tasks", s).load()}
+    expected_chat = [m for _, e in results for _, _, m in e["chat"]]
+    expected_unread = collections.Counter((to, sender) for _, e in results for sender, to, _ in e["chat"])
+    unread = {}
+    for to, _ in expected_unread:
+        if to not in unread:
+            unread[to] = dict(conversations(to, user_shards(to)))
+    expected_tasks = {tid: status for _, e in results for tid, status in e["tasks"].items()}
+    return {
+        "chat_expected": len(expected_chat),
+        "chat_lost": sum(1 for m in expected_chat if m not in chat),
+        "tasks_expected": len(expected_tasks),
+        "tasks_lost": sum(1 for tid in expected_tasks if tid not in tasks),
+        "status_lost": sum(1 for tid, s in expected_tasks.items() if tid in tasks and tasks[tid] != s),
+        "unread_wrong": sum(1 for (to, sender), n in expected_unread.items()
+                            if unread[to].get(sender, {}).get("unread") != n),
+    }
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def report(results, elapsed, reconciliation):
+    merged = {}
+    for latencies, _ in results:
+        for op, values in latencies.items():
+            merged.setdefault(op, []).extend(values)
+    total_ops = sum(len(v) for op, v in merged.items() if not op.endswith(" errors"))
+    print(f"{'operation':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for op, values in sorted(merged.items()):
+        print(f"{op:<22}{len(values):>8}{percentile(values, 50) * 1000:>10.1f}"
+              f"{percentile(values, 95) * 1000:>10.1f}{statistics.mean(values) * 1000:>10.1f}")
+    print(f"\n{total_ops} operations in {elapsed:.2f}s = {total_ops / elapsed:.1f} successful ops/s")
+    print("\nReconciliation (expected vs persisted):")
+    for key, value in reconciliation.items():
+        print(f"  {key:<16}{value}")
+    lost = sum(value for key, value in reconciliation.items() if key.endswith(("_lost", "_wrong")))
+    print("\n" + ("❌ LOST WRITES DETECTED" if lost else "✅ No lost writes"))
+    return lost
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--cities", type=int, default=1, help="spread sessions over this many location shards")
+    parser.add_argument("--mode", choices=["store", "api"], default="store")
+    parser.add_argument("--workdir", help="scratch data directory (default: a temp dir, removed afterwards)")
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="loadtest_"))
+    os.makedirs(workdir, exist_ok=True)
+    # The stores resolve their files against the working directory
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    server = None
+    try:
+        setup(args.sessions, min(args.cities, len(CITIES)))
+        if args.mode == "api":
+            port = free_port()
+            server = subprocess.Popen([sys.executable, os.path.join(APP_DIR, "api.py"), "--port", str(port)],
+                                      cwd=workdir, stdout=subprocess.DEVNULL)
+            time.sleep(1)
+            jobs = [(i, args.iterations, f"http://127.0.0.1:{port}") for i in range(args.sessions)]
+            target = api_session
+        else:
+            jobs = [(i, args.iterations) for i in range(args.sessions)]
+            target = store_session
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.sessions) as pool:
+            results = list(pool.map(lambda job: target(*job), jobs))
+        elapsed = time.perf_counter() - start
+
+        lost = report(results, elapsed, reconcile(results))
+    finally:
+        if server:
+            server.terminate()
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if lost else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Slotted record types for the JSON stores.
+
+Each model keeps one attribute per known field (no per-instance __dict__),
+interns the strings that repeat across records (usernames, skills,
+statuses, roles, locations) and keeps any unknown keys in `extra`, so
+to_dict() round-trips the stored record.
+
+    python models.py --bench 200000    # memory/decode comparison against plain dicts
+"""
+import gc
+import json
+import sys
+
+_intern = sys.intern
+
+
+class Record:
+    __slots__ = ("extra",)
+    FIELDS = ()     # attribute names
+    KEYS = None     # stored JSON keys, when they differ from FIELDS
+    INTERNED = ()   # fields whose string (or list-of-string) values are interned
+
+    def __init_subclass__(cls):
+        super().__init_subclass__()
+        cls.KEYS = cls.KEYS or cls.FIELDS
+        cls._pairs = tuple((field, key, field in cls.INTERNED) for field, key in zip(cls.FIELDS, cls.KEYS))
+        # Slot descriptors' __set__, called directly to skip setattr's attribute lookup
+        cls._decoders = tuple((getattr(cls, field).__set__, key, field in cls.INTERNED)
+                              for field, key in zip(cls.FIELDS, cls.KEYS))
+        cls._key_set = frozenset(cls.KEYS)
+        cls._field_of = dict(zip(cls.KEYS, cls.FIELDS))
+        cls._hook = staticmethod(cls._pairs_hook())
+
+    @classmethod
+    def _pairs_hook(cls):
+        """json object_pairs_hook building instances straight from the parser's pairs.
+
+        Slots for keys a record lacks stay unset and read as None. An object
+        with none of the model's keys (a nested value) stays a plain dict.
+        """
+        setter_of = {key: (set_slot, interned) for set_slot, key, interned in cls._decoders}.get
+        new = cls.__new__
+
+        def hook(pairs):
+            obj = new(cls)
+            extra = None
+            for key, value in pairs:
+                entry = setter_of(key)
+                if entry is None:
+                    if extra is None:
+                        extra = {}
+                    extra[key] = value
+                    continue
+                if entry[1] and value is not None:
+                    value = _intern(value) if value.__class__ is str else tuple(map(_intern, value))
+                entry[0](obj, value)
+            if extra is not None and len(extra) == len(pairs):
+                return extra
+            obj.extra = extra
+            return obj
+
+        return hook
+
+    def to_dict(self):
+        d = {}
+        for field, key, _ in self._pairs:
+            value = getattr(self, field, None)
+            if value is not None:
+                d[key] = list(value) if isinstance(value, tuple) else value
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+    def get(self, key, default=None):
+        """dict-style access by stored key, so code written against plain records keeps working."""
+        field = self._field_of.get(key)
+        value = getattr(self, field, None) if field else (self.extra or {}).get(key)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+# ---------- Models ----------
+class User(Record):
+    FIELDS = ("username", "password", "role", "location", "lat", "lon", "contact", "skills", "name", "age")
+    INTERNED = ("username", "role", "location")
+    __slots__ = FIELDS
+
+
+class Assignment(Record):
+    FIELDS = ("caretaker", "caregiver", "contact", "duration", "status", "joining_date", "ending_date")
+    INTERNED = ("caretaker", "caregiver", "duration", "status")
+    __slots__ = FIELDS
+
+
+class Task(Record):
+    FIELDS = ("id", "caretaker", "caregiver", "task", "skill", "time", "status", "reason", "created_at", "overdue")
+    INTERNED = ("caretaker", "caregiver", "task", "skill", "time", "status")
+    __slots__ = FIELDS
+
+
+class ChatMessage(Record):
+    # "from" is a keyword, so the attribute is from_ while the stored key stays "from"
+    FIELDS = ("from_", "to", "message", "timestamp")
+    KEYS = ("from", "to", "message", "timestamp")
+    INTERNED = ("from_", "to")
+    __slots__ = FIELDS
+
+
+class Payment(Record):
+    FIELDS = ("id", "caretaker", "caregiver", "caregiver_name", "skills", "start_date", "end_date",
+              "total_days", "daily_fee", "discount", "total_fee", "timestamp", "rate_card")
+    INTERNED = ("caretaker", "caregiver", "caregiver_name", "skills", "rate_card")
+    __slots__ = FIELDS
+
+
+# ---------- Decoding ----------
+def decode(raw, model):
+    """List of model instances from the raw bytes/str of a JSON list file."""
+    # Every instance built here stays alive, so cyclic GC passes mid-decode are wasted work
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return json.loads(raw or "[]", object_pairs_hook=model._hook)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+# ---------- Benchmark ----------
+def _bench(n):
+    import random
+    import time
+    import tracemalloc
+
+    users = [f"user_{i}" for i in range(200)]
+    statuses = ["Pending", "Completed", "Missed"]
+    tasks = [{
+        "id": f"{i:032x}", "caretaker": random.choice(users), "caregiver": random.choice(users),
+        "task": "Bathing", "skill": "Bathing", "time": "09:00 AM", "status": random.choice(statuses),
+        "reason": "", "created_at": "2025-07-29T11:58:38.376089",
+    } for i in range(n)]
+    chat = [{
+        "from": random.choice(users), "to": random.choice(users), "message": "hello there",
+        "timestamp": "2025-07-30T14:29:58.422894",
+    } for _ in range(n)]
+
+    print(f"{'records':<14}{'decoder':<10}{'decode s':>10}{'memory MB':>12}")
+    for label, records, model in [("tasks", tasks, Task), ("chat", chat, ChatMessage)]:
+        raw = json.dumps(records)
+        for name, fn in [("dict", json.loads), ("slotted", lambda r: decode(r, model))]:
+            start = time.perf_counter()
+            result = fn(raw)
+            elapsed = time.perf_counter() - start
+            del result
+            # Separate run for memory, since tracing allocations distorts timing
+            tracemalloc.start()
+            result = fn(raw)
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del result
+            print(f"{label:<14}{name:<10}{elapsed:>10.3f}{current / 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    _bench(int(sys.argv[sys.argv.index("--bench") + 1]) if "--bench" in sys.argv else 100000)
@@ -1,13 +1,13 @@
 import streamlit as st
-import json
-import os
 from datetime import datetime
 
-st.title("💸 Payment Records")
+from models import Payment
+from profiling import profile_page
+from store import payments_store
 
+profile_page(__file__)
 
-def load_json(file):
-    return json.load(open(file)) if os.path.exists(file) else []
+st.title("💸 Payment Records")
 
 
 # User session: assuming caretaker/caregiver login logic already handled and sets st.session_state["user"]
@@ -17,7 +17,8 @@ if not user or not isinstance(user, dict) or user.get("role") not in ["Caretaker
     st.warning("🚫 Only Caretakers and Caregivers allowed here.")
     st.stop()
 
-payments = load_json("payments.json")
+# Slotted records, decoded once per change of payments.json
+payments = payments_store().load_models(Payment)
 
 # Filter payments based on user role
 if user["role"] == "Caretaker":
@@ -36,6 +37,8 @@ else:
             st.markdown(f"- **Skills:** {', '.join(p['skills'])}")
             st.markdown(f"- **Total Days:** {p['total_days']}")
             st.markdown(f"- **Daily Fee:** ₹{p['daily_fee']}")
+            if p.get("discount"):
+                st.markdown(f"- **Duration Discount:** {p['discount']:.0%}")
             st.markdown(f"- **Total Fee:** ₹{p['total_fee']}")
             st.markdown(f"- **Saved At:** {p['timestamp']}")
 
@@ -44,7 +47,7 @@ else:
 
     # Prepare table data for st.table (list of lists or list of dicts)
     table_data = []
-    headers = ["Caregiver", "Caretaker", "Skills", "Start Date", "End Date", "Total Days", "Daily Fee", "Total Fee", "Saved At"]
+    headers = ["Caregiver", "Caretaker", "Skills", "Start Date", "End Date", "Total Days", "Daily Fee", "Discount", "Total Fee", "Saved At"]
 
     for p in filtered_payments:
         row = [
@@ -55,6 +58,7 @@ else:
             p.get("end_date", ""),
             p.get("total_days", ""),
             f"₹{p.get('daily_fee', '')}",
+            f"{p.get('discount') or 0:.0%}",
             f"₹{p.get('total_fee', '')}",
             p.get("timestamp", "")
         ]
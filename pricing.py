@@ -0,0 +1,88 @@
+import datetime
+import json
+import os
+from functools import lru_cache
+
+rate_cards_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rate_cards.json")
+
+_cards = {"mtime": None, "cards": []}
+
+
+# ---------- Rate Cards ----------
+def rate_cards():
+    """All rate cards, oldest first; reloaded only when rate_cards.json changes."""
+    mtime = os.stat(rate_cards_path).st_mtime_ns if os.path.exists(rate_cards_path) else None
+    if mtime != _cards["mtime"]:
+        cards = json.load(open(rate_cards_path)) if mtime is not None else []
+        _cards["cards"] = sorted(cards, key=lambda c: c["effective_from"])
+        _cards["mtime"] = mtime
+        _quote.cache_clear()
+    return _cards["cards"]
+
+
+def rate_card(on=None):
+    """The card in effect on a date (today by default); the oldest card before any took effect."""
+    on = (on or datetime.date.today()).isoformat()
+    cards = rate_cards()
+    effective = [c for c in cards if c["effective_from"] <= on]
+    return effective[-1] if effective else cards[0]
+
+
+def _card_version(version):
+    return next(c for c in rate_cards() if c["version"] == version)
+
+
+def skill_fees(on=None):
+    """{skill: per-day fee} from the card in effect on a date."""
+    return dict(rate_card(on)["skills"])
+
+
+# ---------- Quotes ----------
+@lru_cache(maxsize=4096)
+def _quote(skills, start_date, end_date, location, duration, version):
+    card = _card_version(version)
+    multiplier = card.get("location_multipliers", {}).get(location, 1)
+    breakdown = tuple((skill, round(card["skills"][skill] * multiplier, 2)) for skill in skills)
+    daily_fee = round(sum(fee for _, fee in breakdown), 2)
+    total_days = max((end_date - start_date).days, 1)
+    discount = card.get("duration_discounts", {}).get(duration, 0)
+    subtotal = daily_fee * total_days
+    return {
+        "version": version,
+        "breakdown": breakdown,
+        "daily_fee": daily_fee,
+        "total_days": total_days,
+        "discount": discount,
+        "total_fee": round(subtotal * (1 - discount), 2),
+    }
+
+
+def quote(skills, start_date, end_date, location=None, duration=None):
+    """Price an assignment with the card in effect on start_date.
+
+    Memoized on (skills, dates, location, duration, card version), so
+    re-running a page or billing many identical assignments is a dict lookup.
+    Unknown skills raise KeyError.
+    """
+    version = rate_card(start_date)["version"]
+    result = _quote(tuple(sorted(set(skills))), start_date, end_date, location, duration, version)
+    return dict(result, breakdown=dict(result["breakdown"]))
+
+
+def bill(assignments, skills_of, end_date=None, location_of=None):
+    """Batch quotes: [(assignment, quote)] for assignments with a joining date.
+
+    skills_of(assignment) gives the billed skills; location_of(assignment)
+    the pricing location. Assignments are billed to their ending date unless
+    end_date is given.
+    """
+    bills = []
+    for a in assignments:
+        try:
+            start = datetime.date.fromisoformat(a["joining_date"])
+            end = end_date or datetime.date.fromisoformat(a["ending_date"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        location = location_of(a) if location_of else None
+        bills.append((a, quote(skills_of(a), start, end, location, a.get("duration"))))
+    return bills
@@ -0,0 +1,128 @@
+"""On-demand profiling of a page run.
+
+Enabled by the server admin through the APP_PROFILING environment variable:
+
+    APP_PROFILING=query    profile a run when its URL has ?profile=1
+    APP_PROFILING=always   profile every run
+
+Each profiled run writes profiles/<timestamp>_<page>_<user>.txt (cProfile
+stats and top allocation sites) and a matching .prof file for pstats or
+snakeviz, then shows a short summary at the bottom of the page.
+"""
+import cProfile
+import datetime
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+import streamlit as st
+
+PROFILE_DIR = "profiles"
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_local = threading.local()  # Streamlit runs each session's script in its own thread
+# tracemalloc and (from Python 3.12) cProfile are process-wide: one profiled run at a time
+_profile_lock = threading.Lock()
+_log = logging.getLogger(__name__)
+
+
+def _requested():
+    mode = os.environ.get("APP_PROFILING", "").lower()
+    if mode == "always":
+        return True
+    return mode == "query" and st.query_params.get("profile") == "1"
+
+
+def profile_page(page_file):
+    """Call first thing in a page. When profiling is requested, runs the whole
+    page under cProfile and tracemalloc, reports, and stops the outer run.
+
+    While another session's run is being profiled, the page runs unprofiled
+    and the skip is logged: nothing may be drawn before the page's
+    st.set_page_config() call.
+    """
+    page_file = os.path.abspath(page_file)
+    running = _local.__dict__.setdefault("running", set())
+    if page_file in running or not _requested():
+        return
+    if not _profile_lock.acquire(blocking=False):
+        _log.warning("Not profiling %s: another run is being profiled", os.path.basename(page_file))
+        return
+
+    try:
+        code = compile(open(page_file, encoding="utf-8").read(), page_file, "exec")
+        page_globals = {"__name__": "__main__", "__file__": page_file}
+        profiler = cProfile.Profile()
+        own_tracing = not tracemalloc.is_tracing()
+        if own_tracing:
+            tracemalloc.start(10)
+        tracemalloc.reset_peak()
+        running.add(page_file)
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            exec(code, page_globals)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if own_tracing:
+                tracemalloc.stop()
+            running.discard(page_file)
+            # Also on st.stop()/st.rerun(), which end the page by raising
+            report = _write_report(page_file, profiler, snapshot, elapsed, peak)
+            _show_summary(report)
+    finally:
+        _profile_lock.release()
+    st.stop()
+
+
+def _write_report(page_file, profiler, snapshot, elapsed, peak):
+    user = (st.session_state.get("user") or {}).get("username", "anonymous")
+    page = os.path.splitext(os.path.basename(page_file))[0]
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    base = os.path.join(PROFILE_DIR, re.sub(r"[^\w.-]+", "_", f"{stamp}_{page}_{user}"))
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    out = io.StringIO()
+    out.write(f"page: {page}\nuser: {user}\nwall time: {elapsed:.3f}s\npeak traced memory: {peak / 1e6:.1f} MB\n\n")
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(40)
+    out.write("\nTop allocation sites:\n")
+    top_allocs = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)]).statistics("lineno")[:20]
+    for stat in top_allocs:
+        out.write(f"{stat}\n")
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(out.getvalue())
+    profiler.dump_stats(base + ".prof")
+
+    # Slowest functions defined in the app itself, by cumulative time
+    own = [
+        (ct, f"{os.path.basename(file)}:{line} {func}")
+        for (file, line, func), (_, _, _, ct, _) in stats.stats.items()
+        if file.startswith(APP_DIR) and not file.endswith("profiling.py")
+    ]
+    return {
+        "path": base + ".txt",
+        "elapsed": elapsed,
+        "peak": peak,
+        "hot": sorted(own, reverse=True)[:5],
+        "allocs": [str(s) for s in top_allocs[:3]],
+    }
+
+
+def _show_summary(report):
+    with st.expander(f"🩺 Profile: {report['elapsed'] * 1000:.0f} ms, peak {report['peak'] / 1e6:.1f} MB"):
+        st.markdown(f"Saved to `{report['path']}`")
+        st.markdown("**Hottest app functions (cumulative)**")
+        for ct, name in report["hot"]:
+            st.markdown(f"- `{name}` — {ct * 1000:.1f} ms")
+        st.markdown("**Top allocation sites**")
+        for line in report["allocs"]:
+            st.markdown(f"- `{line}`")
@@ -0,0 +1,144 @@
+"""Per-caregiver task reliability counters.
+
+    python reliability.py rebuild   # recount every shard; only needed after manual edits
+
+Counters live next to each shard's tasks.json, stamped with the tasks file
+version they were counted at. Task writes made through add_task() and
+update_task() adjust them under the tasks file's lock; any other write
+leaves the stamp stale, so that shard is recounted on its next read.
+"""
+import os
+import sys
+
+from models import Task
+from store import load_derived, shard_store, shards, update_with_derived
+
+RELIABILITY_FILE = "reliability.json"
+STATUS_COUNTERS = {"Pending": "pending", "Completed": "completed", "Missed": "missed"}
+
+
+# ---------- Counters ----------
+def _empty():
+    return {"pending": 0, "completed": 0, "missed": 0, "on_time": 0, "reasons": {}}
+
+
+def _reason_key(reason):
+    return " ".join(str(reason or "").split()).capitalize()
+
+
+def _apply(counters, task, status, reason, sign):
+    """Add (sign=1) or remove (sign=-1) one task in a given status from the counters."""
+    counter = STATUS_COUNTERS.get(status)
+    if counter is None:
+        return
+    counters[counter] += sign
+    if status == "Completed" and not task.get("overdue"):
+        counters["on_time"] += sign
+    if status == "Missed" and _reason_key(reason):
+        reasons = counters["reasons"]
+        key = _reason_key(reason)
+        reasons[key] = reasons.get(key, 0) + sign
+        if reasons[key] <= 0:
+            del reasons[key]
+
+
+def _merge(into, counters):
+    for key in STATUS_COUNTERS.values():
+        into[key] += counters[key]
+    into["on_time"] += counters["on_time"]
+    for reason, n in counters["reasons"].items():
+        into["reasons"][reason] = into["reasons"].get(reason, 0) + n
+
+
+def reliability_path(tasks_store):
+    return os.path.join(os.path.dirname(tasks_store.path), RELIABILITY_FILE)
+
+
+def _counter(tasks_store):
+    def count():
+        stats = {}
+        for t in tasks_store.load_models(Task):
+            _apply(stats.setdefault(t.get("caregiver"), _empty()), t, t.get("status", "Pending"), t.get("reason"), 1)
+        return stats
+
+    return count
+
+
+def shard_counters(tasks_store, rebuild=False):
+    """{caregiver: counters} for one task shard; shared, treat as read-only."""
+    return load_derived(tasks_store, reliability_path(tasks_store), _counter(tasks_store), rebuild)
+
+
+def counters(shard_names):
+    """{caregiver: counters} merged over the given task shards."""
+    merged = {}
+    for shard in shard_names:
+        for caregiver, c in shard_counters(shard_store("tasks", shard)).items():
+            _merge(merged.setdefault(caregiver, _empty()), c)
+    return merged
+
+
+def rebuild():
+    """Recount every shard from scratch."""
+    for shard in shards():
+        shard_counters(shard_store("tasks", shard), rebuild=True)
+
+
+# ---------- Task Writes ----------
+def _update(tasks_store, fn, apply):
+    return update_with_derived(tasks_store, fn, reliability_path(tasks_store), _counter(tasks_store), apply)
+
+
+def add_task(tasks_store, task):
+    """Append a newly assigned task and count it as pending."""
+    def apply(stats, _):
+        _apply(stats.setdefault(task["caregiver"], _empty()), task, task.get("status", "Pending"), "", 1)
+
+    _update(tasks_store, lambda tasks: tasks.append(task), apply)
+
+
+def update_task(tasks_store, fn):
+    """tasks_store.update(fn) for a change to one task, moving it between counters.
+
+    fn edits the fresh list in place and returns (before, after) copies of the
+    task it changed, or None; that is also the return value.
+    """
+    def state(t):
+        return t.get("status", "Pending"), _reason_key(t.get("reason")), bool(t.get("overdue"))
+
+    def apply(stats, changed):
+        if not changed or state(changed[0]) == state(changed[1]):
+            return
+        before, after = changed
+        counters = stats.setdefault(after["caregiver"], _empty())
+        _apply(counters, before, before.get("status", "Pending"), before.get("reason"), -1)
+        _apply(counters, after, after.get("status", "Pending"), after.get("reason"), 1)
+
+    return _update(tasks_store, fn, apply)
+
+
+# ---------- Display ----------
+def summary(counters, top_reasons=2):
+    """One-line reliability summary for a caregiver card."""
+    if not counters or not any(counters[k] for k in STATUS_COUNTERS.values()):
+        return "No task history yet"
+    parts = [f"✅ {counters['completed']} done", f"❌ {counters['missed']} missed", f"⏳ {counters['pending']} pending"]
+    if counters["completed"]:
+        parts.append(f"🕒 {counters['on_time'] / counters['completed']:.0%} on time")
+    reasons = sorted(counters["reasons"].items(), key=lambda r: -r[1])[:top_reasons]
+    if reasons:
+        parts.append("misses: " + ", ".join(f"{r} ({n})" for r, n in reasons))
+    return " · ".join(parts)
+
+
+# ---------- CLI ----------
+def main(argv):
+    if argv == ["rebuild"]:
+        rebuild()
+        print(f"recounted {len(shards())} shards")
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,99 @@
+import datetime
+import heapq
+
+TIME_FORMAT = "%I:%M %p"
+
+_schedules = {}
+
+
+# ---------- Due Times ----------
+def parse_due(task):
+    """Due datetime of a task: its "%I:%M %p" time on the day it was created.
+
+    A time earlier than the creation time means the next occurrence, e.g. a
+    task created at 10 PM for 07:00 AM is due the following morning.
+    """
+    try:
+        due_time = datetime.datetime.strptime(task.get("time", ""), TIME_FORMAT).time()
+        created = datetime.datetime.fromisoformat(task.get("created_at", ""))
+    except (TypeError, ValueError):
+        return None
+    due = datetime.datetime.combine(created.date(), due_time)
+    if due < created.replace(second=0, microsecond=0):
+        due += datetime.timedelta(days=1)
+    return due
+
+
+# ---------- Schedule ----------
+class TaskSchedule:
+    """Min-heap of (due, index) for every Pending task in a task list."""
+
+    def __init__(self, tasks):
+        self.heap = []
+        for i, t in enumerate(tasks):
+            if t.get("status", "Pending") != "Pending":
+                continue
+            due = parse_due(t)
+            if due is not None:
+                self.heap.append((due, i))
+        heapq.heapify(self.heap)
+
+    def _until(self, limit):
+        """Entries due at or before limit; walks only the heap prefix that qualifies."""
+        found, stack = [], [0] if self.heap else []
+        while stack:
+            pos = stack.pop()
+            due, i = self.heap[pos]
+            if due > limit:
+                continue
+            found.append((due, i))
+            stack.extend(c for c in (2 * pos + 1, 2 * pos + 2) if c < len(self.heap))
+        return sorted(found)
+
+    def overdue(self, now=None):
+        """[(due, index)] of Pending tasks already past their time, oldest first."""
+        return self._until(now or datetime.datetime.now())
+
+    def due_soon(self, within=datetime.timedelta(hours=1), now=None):
+        """[(due, index)] of Pending tasks coming due within the given window."""
+        now = now or datetime.datetime.now()
+        return [(due, i) for due, i in self._until(now + within) if due > now]
+
+
+def task_schedule(tasks, path, version):
+    """Schedule for `tasks`, rebuilt only when the file version they were loaded at changes.
+
+    Pass the version from JsonStore.load_versioned(), not a fresh stat: a write
+    landing between the load and this call must not tag an old list as new.
+    """
+    cached = _schedules.get(path)
+    if cached is None or cached[0] != version or cached[2] != len(tasks):
+        cached = (version, TaskSchedule(tasks), len(tasks))
+        _schedules[path] = cached
+    return cached[1]
+
+
+def _unflagged(tasks, schedule, now=None):
+    return [i for _, i in schedule.overdue(now)
+            if tasks[i].get("status", "Pending") == "Pending" and not tasks[i].get("overdue")]
+
+
+def flag_overdue(tasks, schedule, now=None):
+    """Mark overdue Pending tasks with "overdue": True; returns True if any changed."""
+    unflagged = _unflagged(tasks, schedule, now)
+    for i in unflagged:
+        tasks[i]["overdue"] = True
+    return bool(unflagged)
+
+
+def flag_overdue_in(store, tasks, schedule, now=None):
+    """Flag overdue tasks in the store; returns True if it was written.
+
+    `tasks`/`schedule` (a page's copy) only decide whether anything needs
+    flagging. The flags are set on the fresh list under the store lock,
+    with due times re-checked, so a status saved since the page loaded is
+    never overwritten.
+    """
+    if not _unflagged(tasks, schedule, now):
+        return False
+    return store.update(lambda fresh: flag_overdue(fresh, TaskSchedule(fresh), now))
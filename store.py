@@ -0,0 +1,472 @@
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+
+try:
+    import fcntl
+
+    def _lock_file(f):
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+    def _unlock_file(f):
+        fcntl.flock(f, fcntl.LOCK_UN)
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+from changes import diff_ids, emit, payment_id, payment_key, record_ids
+from geo import haversine_km, normalize_location
+from models import decode
+
+# Logical store names used by the API; pages keep addressing stores by file name.
+DATA_FILES = {
+    "users": "users.json",
+    "assignments": "assignments.json",
+    "tasks": "assigned_tasks.json",
+    "chat": "chat.json",
+    "payments": "payments.json",
+}
+
+# Stores partitioned by location; payments stay a single global file.
+SHARDED = ["users", "assignments", "tasks", "chat"]
+SHARD_ROOT = "shards"
+DIRECTORY_FILE = "shard_directory.json"
+UNPLACED = "Unplaced"
+
+_pool = {}
+_pool_lock = threading.Lock()
+_migrate_lock = threading.Lock()
+
+
+# ---------- Store Handles ----------
+class JsonStore:
+    """One JSON file, cached by mtime and written atomically.
+
+    Handles are pooled per path (see get_store), so every Streamlit rerun and
+    API request in a process shares one cache and one write lock per file.
+    Writes also hold an exclusive lock on <path>.lock, which serializes them
+    with the other processes (the Streamlit server, api.py) using the file.
+    """
+
+    def __init__(self, path, empty=b"[]"):
+        self.path = path
+        self.empty = empty
+        self.lock = threading.RLock()
+        self._version = None
+        self._raw = empty
+        self._models = None
+        self._index = None
+        self._lock_file = None
+        self._lock_depth = 0
+        self._shared = (None, {})
+        # Derived stores (counters, inboxes) are rebuilt from their sources, not logged
+        self.log_changes = True
+        self._record_ids = functools.partial(record_ids, path)
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Thread lock plus the inter-process file lock; re-entrant within a thread."""
+        with self.lock:
+            if not self._lock_depth:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._lock_file = open(self.path + ".lock", "a+")
+                _lock_file(self._lock_file)
+            self._lock_depth += 1
+            try:
+                yield self
+            finally:
+                self._lock_depth -= 1
+                if not self._lock_depth:
+                    _unlock_file(self._lock_file)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def _stat_version(self):
+        st = os.stat(self.path)
+        # Every save replaces the file, so the inode changes even within one mtime tick
+        return st.st_mtime_ns, st.st_ino, st.st_size
+
+    def _refresh(self):
+        try:
+            version = self._stat_version()
+        except FileNotFoundError:
+            self._version, self._raw = None, self.empty
+            return
+        if version != self._version:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            self._version, self._raw = version, raw or self.empty
+
+    def load(self):
+        """Fresh copy of the data; callers may mutate it freely before save()."""
+        with self.lock:
+            self._refresh()
+            return json.loads(self._raw)
+
+    def load_versioned(self):
+        """(file version, fresh copy of the data), read together under the lock."""
+        with self.lock:
+            self._refresh()
+            return self._version, json.loads(self._raw)
+
+    def load_shared(self, derive=None):
+        """Parsed data, or derive(data), computed once per file version.
+
+        The result is shared between callers: treat it as read-only.
+        """
+        with self.lock:
+            self._refresh()
+            if self._shared[0] != self._version:
+                self._shared = (self._version, {})
+            cache = self._shared[1]
+            if derive not in cache:
+                if None not in cache:
+                    cache[None] = json.loads(self._raw)
+                cache[derive] = derive(cache[None]) if derive else cache[None]
+            return cache[derive]
+
+    def load_models(self, model):
+        """Slotted model instances (see models.py), decoded once per file version.
+
+        The list and records are shared between callers: treat them as read-only.
+        """
+        with self.lock:
+            self._refresh()
+            key = (self._version, model)
+            if self._models is None or self._models[0] != key:
+                self._models = (key, decode(self._raw, model))
+            return self._models[1]
+
+    def save(self, data, indent=2):
+        """Write atomically and log the per-record changes to the change feed."""
+        raw = json.dumps(data, indent=indent).encode()
+        with self.locked():
+            self._refresh()  # re-read under the file lock: another process may have written
+            # Record ids of the current version, usually already parsed by an earlier read
+            before = self.load_shared(self._record_ids) if self.log_changes else None
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(raw)
+            os.replace(tmp, self.path)
+            self._version, self._raw = self._stat_version(), raw
+            if self.log_changes:
+                emit(self.path, diff_ids(before, record_ids(self.path, data)))
+
+    def version(self):
+        """Current file version, for caches of data derived from this store."""
+        with self.lock:
+            self._refresh()
+            return self._version
+
+    def update(self, fn):
+        """Read-modify-write under the store lock; fn mutates the data and returns a result."""
+        with self.locked():
+            data = self.load()
+            result = fn(data)
+            self.save(data)
+            return result
+
+    def index(self, key_of):
+        """{key: position} over the current records, built once per file version."""
+        with self.lock:
+            self._refresh()
+            cache_key = (self._version, key_of)
+            if self._index is None or self._index[0] != cache_key:
+                self._index = (cache_key, {key_of(r): i for i, r in enumerate(json.loads(self._raw))})
+            return self._index[1]
+
+    def etag(self):
+        """Content hash of the current file, for HTTP conditional requests."""
+        with self.lock:
+            self._refresh()
+            return hashlib.sha1(self._raw).hexdigest()
+
+
+def get_store(name, empty=b"[]"):
+    """Pooled handle for a logical store name ("payments") or a file path."""
+    path = os.path.abspath(DATA_FILES.get(name, name))
+    with _pool_lock:
+        if path not in _pool:
+            _pool[path] = JsonStore(path, empty)
+        return _pool[path]
+
+
+def derived_store(path, build, empty=b"{}"):
+    """Pooled handle for a file computed from other stores, written by build() when missing."""
+    store = get_store(path, empty)
+    store.log_changes = False
+    if not os.path.exists(store.path):
+        with store.locked():
+            if not os.path.exists(store.path):
+                store.save(build())
+    return store
+
+
+def _derived_handle(path):
+    store = get_store(path, empty=b"{}")
+    store.log_changes = False
+    return store
+
+
+def _stamp(source):
+    return list(source.version() or [])
+
+
+def load_derived(source, path, build, rebuild=False):
+    """Data derived from one source store, stamped with the source version it reflects.
+
+    A stale stamp (a source write that bypassed update_with_derived, a failed
+    update, a manual edit) or rebuild=True runs build() under the source's
+    lock. The result is shared: treat it as read-only.
+    """
+    store = _derived_handle(path)
+    stamped = store.load_shared()
+    if rebuild or stamped.get("source") != _stamp(source):
+        with source.locked():
+            stamped = store.load_shared()
+            if rebuild or stamped.get("source") != _stamp(source):
+                stamped = {"source": _stamp(source), "data": build()}
+                store.save(stamped)
+    return stamped["data"]
+
+
+def update_with_derived(source, fn, path, build, apply):
+    """source.update(fn), then apply(derived data, fn's result), both under the source's lock.
+
+    Returns fn's result. If apply fails, the derived stamp is left stale and
+    the next load_derived() recounts.
+    """
+    with source.locked():
+        load_derived(source, path, build)
+        result = source.update(fn)
+        store = _derived_handle(path)
+        data = store.load()["data"]
+        apply(data, result)
+        store.save({"source": _stamp(source), "data": data})
+    return result
+
+
+# ---------- JSON Utilities ----------
+def load_json(file):
+    return get_store(file).load()
+
+
+def save_json(file, data, indent=2):
+    get_store(file).save(data, indent=indent)
+
+
+# ---------- Payments ----------
+_payments_checked = False
+
+
+def payments_store():
+    """Handle for payments.json, deduplicated once per process before first use."""
+    global _payments_checked
+    if not _payments_checked:
+        dedup_payments()
+        _payments_checked = True
+    return get_store("payments")
+
+
+def save_payment(entry):
+    """Idempotent save keyed by payment_key: "created", "updated" or "unchanged".
+
+    Saving the same caretaker, caregiver, skills and period again (a double
+    click or a rerun) replaces the earlier record instead of adding one.
+    """
+    entry = dict(entry, id=payment_key(entry))
+    store = payments_store()
+    with store.locked():
+        payments = store.load()
+        pos = store.index(payment_id).get(entry["id"])
+        if pos is None:
+            payments.append(entry)
+            result = "created"
+        elif _without_timestamp(payments[pos]) == _without_timestamp(entry):
+            return "unchanged"
+        else:
+            payments[pos] = entry
+            result = "updated"
+        store.save(payments)
+        return result
+
+
+def _without_timestamp(payment):
+    return {k: v for k, v in payment.items() if k != "timestamp"}
+
+
+def dedup_payments():
+    """One-time cleanup of payments.json.
+
+    Drops records without skills (saved before any were selected), keeps the
+    latest record per payment_key and stamps each with its id. A no-op once
+    every record has an id.
+    """
+    store = get_store("payments")
+    with store.locked():
+        payments = store.load()
+        if all(p.get("id") for p in payments):
+            return False
+        latest = {}
+        for p in payments:
+            if p.get("skills"):
+                key = payment_key(p)
+                if key not in latest or p.get("timestamp", "") >= latest[key].get("timestamp", ""):
+                    latest[key] = dict(p, id=key)
+        store.save(sorted(latest.values(), key=lambda p: p.get("timestamp", "")))
+        return True
+
+
+# ---------- Location Shards ----------
+def shard_key(location):
+    """Shard for a free-text location: the gazetteer city, else the tidied text."""
+    place = normalize_location(location)
+    if place:
+        return place["name"]
+    return " ".join(str(location or "").split()).title() or UNPLACED
+
+
+def shard_store(name, shard):
+    """Handle for one sharded store ("users", "assignments", "tasks", "chat") of a shard."""
+    migrate_legacy()
+    return _shard_store(name, shard)
+
+
+def _shard_store(name, shard):
+    folder = re.sub(r"[^a-z0-9]+", "-", shard.lower()).strip("-") or "unplaced"
+    return get_store(os.path.join(SHARD_ROOT, folder, DATA_FILES[name]))
+
+
+def directory_store():
+    """The global {username: {"shard", "role", "linked"}} directory."""
+    migrate_legacy()
+    return get_store(DIRECTORY_FILE, empty=b"{}")
+
+
+def _shard_names(directory):
+    return sorted({entry["shard"] for entry in directory.values()})
+
+
+def _by_username(users):
+    return {u.get("username"): u for u in users}
+
+
+def shards():
+    """All shard names currently holding users."""
+    return list(directory_store().load_shared(_shard_names))
+
+
+def user_shards(username):
+    """Shards holding this user's assignments, tasks and chat.
+
+    A caretaker's data lives in their own shard; a caregiver is linked to
+    the shard of every caretaker they are assigned to.
+    """
+    entry = directory_store().load_shared().get(username)
+    if not entry:
+        return []
+    return list(entry.get("linked") or [entry["shard"]])
+
+
+def shards_near(lat, lon, radius_km):
+    """Shards whose city lies within radius_km of a point; unknown cities are skipped."""
+    near = []
+    for shard in shards():
+        place = normalize_location(shard)
+        if place and haversine_km(lat, lon, place["lat"], place["lon"]) <= radius_km:
+            near.append(shard)
+    return near
+
+
+def find_user(username):
+    """User record looked up via the directory, touching only that user's shard.
+
+    Both lookups use indexes parsed once per file version; the record is a copy.
+    """
+    entry = directory_store().load_shared().get(username)
+    if not entry:
+        return None
+    user = shard_store("users", entry["shard"]).load_shared(_by_username).get(username)
+    return dict(user) if user else None
+
+
+def load_users(shard_names):
+    """Users of the given shards, concatenated."""
+    return [u for shard in shard_names for u in shard_store("users", shard).load()]
+
+
+def add_user(record):
+    """Register a user in their location's shard; False if the username is taken."""
+    def apply(directory):
+        if record["username"] in directory:
+            return False
+        shard = shard_key(record.get("location"))
+        shard_store("users", shard).update(lambda users: users.append(record))
+        directory[record["username"]] = {"shard": shard, "role": record.get("role"), "linked": []}
+        return True
+
+    return directory_store().update(apply)
+
+
+def link_shard(username, shard):
+    """Record that a caregiver has data in another caretaker's shard."""
+    def apply(directory):
+        entry = directory.get(username)
+        if entry is not None and shard not in entry.setdefault("linked", []):
+            entry["linked"].append(shard)
+
+    directory_store().update(apply)
+
+
+def migrate_legacy():
+    """One-time split of the flat users/assignments/tasks/chat files into shards.
+
+    Runs when no directory exists yet. Users go to their location's shard;
+    assignments, tasks and chat go to the caretaker's shard. The flat files
+    are left in place untouched.
+    """
+    if os.path.exists(DIRECTORY_FILE):
+        return
+    with _migrate_lock, get_store(DIRECTORY_FILE, empty=b"{}").locked():
+        if os.path.exists(DIRECTORY_FILE):
+            return
+        legacy = {name: load_json(DATA_FILES[name]) for name in SHARDED}
+        directory = {}
+        buckets = {}
+        for u in legacy["users"]:
+            shard = shard_key(u.get("location"))
+            directory[u["username"]] = {"shard": shard, "role": u.get("role"), "linked": []}
+            buckets.setdefault((shard, "users"), []).append(u)
+
+        def owner_shard(*usernames):
+            entries = [directory[n] for n in usernames if n in directory]
+            caretakers = [e for e in entries if e["role"] == "Caretaker"]
+            return (caretakers or entries or [{"shard": UNPLACED}])[0]["shard"]
+
+        for a in legacy["assignments"]:
+            caretaker = a.get("caretaker", a.get("Caretaker"))
+            shard = owner_shard(caretaker)
+            buckets.setdefault((shard, "assignments"), []).append(a)
+            entry = directory.get(a.get("caregiver"))
+            if entry is not None and shard not in entry["linked"]:
+                entry["linked"].append(shard)
+        for t in legacy["tasks"]:
+            buckets.setdefault((owner_shard(t.get("caretaker")), "tasks"), []).append(t)
+        for c in legacy["chat"]:
+            buckets.setdefault((owner_shard(c.get("from"), c.get("to")), "chat"), []).append(c)
+
+        for (shard, name), records in buckets.items():
+            _shard_store(name, shard).save(records, indent=4 if name == "users" else 2)
+        get_store(DIRECTORY_FILE, empty=b"{}").save(directory)